@@ -0,0 +1,44 @@
+# actions.py
+# What a recognized command does, shared by runtime.py and mp_pipeline.py.
+#
+#   process = execute("open_chrome")     # starts the program, None if nothing started
+#   cancel(process)                      # stops it again if it is still running
+#   play_beep()                          # short tone after the wake word
+import subprocess
+
+import numpy as np
+
+ACTIONS = {
+    "open_chrome": ["google-chrome"],
+    "open_firefox": ["firefox"],
+    "open_spotify": ["spotify"],
+    "open_terminal": ["gnome-terminal"],    # or 'konsole', 'xterm', depending on the system
+}
+
+
+def play_beep(sample_rate=16000):
+    try:
+        import sounddevice as sd
+        t = np.linspace(0, 0.2, int(sample_rate * 0.2), False)
+        sd.play(0.3 * np.sin(2 * np.pi * 1000 * t), samplerate=sample_rate)
+        sd.wait()
+    except Exception as e:
+        print("Beep error:", e)
+
+
+def execute(command):
+    """Starts the command's program; returns the process, None if nothing was started."""
+    if command not in ACTIONS:
+        print(f"No action defined for: {command}")
+        return None
+    try:
+        return subprocess.Popen(ACTIONS[command])
+    except Exception as e:
+        print("Execution error:", e)
+        return None
+
+
+def cancel(process):
+    # a speculatively started program the final transcript didn't confirm
+    if process is not None and process.poll() is None:
+        process.terminate()
@@ -1,5 +1,10 @@
 import sounddevice as sd
+from device_probe import load_devices, best_input
 
 print("Available devices:")
 print(sd.query_devices())
-print("Default device",sd.default.device)
\ No newline at end of file
+print("Default device",sd.default.device)
+
+best = best_input(load_devices())   # probed once, cached in audio_devices.json
+if best is not None:
+    print(f"Best input: {best['index']} {best['name']} ({', '.join(str(r) for r in best['rates'])} Hz)")
@@ -0,0 +1,213 @@
+# autotune.py
+# Finds the fastest model settings that are still accurate enough on this CPU.
+#
+#   python autotune.py record clips/ --count 12     # read phrases from commands.csv aloud
+#   python autotune.py run clips/ --max-wer 0.15 --max-rtf 0.3
+#
+# A clip set is a folder of 16 kHz WAV files, each with a .txt file of the
+# same name holding what was said. `record` builds one from the phrases in
+# commands.csv; any other recordings with transcripts work too.
+#
+# `run` decodes every clip with each combination of model, compute_type,
+# cpu_threads and beam_size, measuring word error rate (WER) and real-time
+# factor (RTF = decode time / audio length). The fastest combination within
+# --max-wer and --max-rtf is written to model_profile.json, which every entry
+# point loads at startup (see model_profile.py).
+import argparse
+import csv
+import os
+import platform
+import random
+import re
+import time
+
+from rapidfuzz.distance import Levenshtein
+
+from model_profile import PROFILE_FILE, save_profile
+from wav_io import memmap_wav, to_float32
+
+SAMPLE_RATE = 16000
+MODELS = ["tiny.en", "base.en"]
+COMPUTE_TYPES = ["int8", "int8_float32", "float32"]
+BEAM_SIZES = [1, 2, 5]
+MAX_WER = 0.15
+MAX_RTF = 0.3
+
+
+def default_threads():
+    # 1, 2, 4, ... up to the number of cores
+    cores = os.cpu_count() or 1
+    threads = [1]
+    while threads[-1] * 2 <= cores:
+        threads.append(threads[-1] * 2)
+    if threads[-1] != cores:
+        threads.append(cores)
+    return threads
+
+
+# ================================
+# CLIP SET
+# ================================
+def normalize(text):
+    return re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    return Levenshtein.distance(ref, hyp) / max(1, len(ref))
+
+
+def load_clips(folder):
+    clips = []
+    for name in sorted(os.listdir(folder)):
+        base, ext = os.path.splitext(name)
+        txt = os.path.join(folder, base + ".txt")
+        if ext.lower() != ".wav" or not os.path.exists(txt):
+            continue
+        samples, rate = memmap_wav(os.path.join(folder, name))
+        if rate != SAMPLE_RATE:
+            print(f"Skipping {name}: {rate} Hz, expected {SAMPLE_RATE} Hz")
+            continue
+        with open(txt, encoding="utf-8") as f:
+            clips.append((name, to_float32(samples), f.read().strip()))
+    return clips
+
+
+def record_clips(folder, count, seconds, phrases_file="commands.csv"):
+    import sounddevice as sd
+    import wave
+    with open(phrases_file, newline="", encoding="utf-8") as f:
+        phrases = [row["phrase"] for row in csv.DictReader(f)]
+    os.makedirs(folder, exist_ok=True)
+    for i, phrase in enumerate(random.sample(phrases, min(count, len(phrases)))):
+        input(f"[{i + 1}/{count}] Press Enter and say '{phrase}'...")
+        audio = sd.rec(int(seconds * SAMPLE_RATE), samplerate=SAMPLE_RATE, channels=1, dtype="int16")
+        sd.wait()
+        base = os.path.join(folder, f"clip_{i:03d}")
+        with wave.open(base + ".wav", "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(SAMPLE_RATE)
+            w.writeframes(audio.tobytes())
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(phrase + "\n")
+    print(f"Saved clips to {folder}")
+
+
+# ================================
+# BENCHMARK
+# ================================
+def evaluate(model, clips, beam_size):
+    errors, words, decode_time, audio_time = 0.0, 0, 0.0, 0.0
+    for _, audio, reference in clips:
+        t0 = time.perf_counter()
+        segments, _ = model.transcribe(audio, language="en", beam_size=beam_size, temperature=0.0,
+                                       condition_on_previous_text=False)
+        text = "".join(s.text for s in segments)      # segments are lazy, decode happens here
+        decode_time += time.perf_counter() - t0
+        audio_time += len(audio) / SAMPLE_RATE
+        n = len(normalize(reference))
+        errors += word_error_rate(reference, text) * max(1, n)
+        words += max(1, n)
+    return errors / words, decode_time / audio_time
+
+
+def run_grid(clips, models, compute_types, threads, beams):
+    from faster_whisper import WhisperModel
+    results = []
+    for name in models:
+        for compute_type in compute_types:
+            for n_threads in threads:
+                try:
+                    t0 = time.perf_counter()
+                    model = WhisperModel(name, device="cpu", compute_type=compute_type, cpu_threads=n_threads)
+                    load = time.perf_counter() - t0
+                except (ValueError, RuntimeError) as e:
+                    print(f"  {name} {compute_type}: not supported here ({e})")
+                    break
+                evaluate(model, clips[:1], 1)     # warm-up
+                for beam in beams:
+                    wer, rtf = evaluate(model, clips, beam)
+                    results.append({"model": name, "compute_type": compute_type, "cpu_threads": n_threads,
+                                    "beam_size": beam, "wer": round(wer, 4), "rtf": round(rtf, 4),
+                                    "load_seconds": round(load, 2)})
+                    print(f"  {name:10s} {compute_type:13s} threads={n_threads:<3d} beam={beam}  "
+                          f"WER {wer:6.1%}  RTF {rtf:.3f}")
+                del model
+    return results
+
+
+def choose(results, max_wer, max_rtf):
+    """Fastest result within both targets; the most accurate one if none is."""
+    passing = [r for r in results if r["wer"] <= max_wer and r["rtf"] <= max_rtf]
+    if passing:
+        return min(passing, key=lambda r: (r["rtf"], r["wer"], r["beam_size"])), True
+    return min(results, key=lambda r: (r["wer"], r["rtf"])), False
+
+
+def fast_beam(results, best, max_wer):
+    # smallest beam of the chosen configuration that still meets the WER target, for wake checks and partials
+    same = [r for r in results if all(r[k] == best[k] for k in ("model", "compute_type", "cpu_threads"))]
+    ok = [r["beam_size"] for r in same if r["wer"] <= max_wer]
+    return min(ok) if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune model settings for this host")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    rec = sub.add_parser("record", help="record a clip set from the phrases in commands.csv")
+    rec.add_argument("folder")
+    rec.add_argument("--count", type=int, default=12)
+    rec.add_argument("--seconds", type=float, default=3.0)
+
+    run = sub.add_parser("run", help="benchmark settings on a clip set and write the profile")
+    run.add_argument("folder")
+    run.add_argument("--models", nargs="+", default=MODELS)
+    run.add_argument("--compute-types", nargs="+", default=COMPUTE_TYPES)
+    run.add_argument("--threads", nargs="+", type=int, default=default_threads())
+    run.add_argument("--beams", nargs="+", type=int, default=BEAM_SIZES)
+    run.add_argument("--max-wer", type=float, default=MAX_WER)
+    run.add_argument("--max-rtf", type=float, default=MAX_RTF)
+    run.add_argument("--out", default=PROFILE_FILE)
+    args = parser.parse_args()
+
+    if args.cmd == "record":
+        record_clips(args.folder, args.count, args.seconds)
+        return
+
+    clips = load_clips(args.folder)
+    if not clips:
+        parser.error(f"no WAV files with a matching .txt in {args.folder}")
+    total = sum(len(a) for _, a, _ in clips) / SAMPLE_RATE
+    print(f"{len(clips)} clips, {total:.1f} s of audio, {os.cpu_count()} cores")
+
+    results = run_grid(clips, args.models, args.compute_types, args.threads, args.beams)
+    if not results:
+        print("Nothing could be benchmarked")
+        return
+    best, met = choose(results, args.max_wer, args.max_rtf)
+    if not met:
+        print(f"No setting reached WER <= {args.max_wer:.0%} and RTF <= {args.max_rtf}; using the most accurate")
+
+    profile = {
+        "model": best["model"],
+        "device": "cpu",
+        "compute_type": best["compute_type"],
+        "cpu_threads": best["cpu_threads"],
+        "beam_size": best["beam_size"],
+        "fast_beam_size": fast_beam(results, best, args.max_wer),
+        "wer": best["wer"],
+        "rtf": best["rtf"],
+        "targets": {"max_wer": args.max_wer, "max_rtf": args.max_rtf, "met": met},
+        "host": {"machine": platform.machine(), "processor": platform.processor(), "cores": os.cpu_count()},
+        "tuned_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results,
+    }
+    save_profile(profile, args.out)
+    print(f"Chose {best['model']} {best['compute_type']}, {best['cpu_threads']} threads, beam {best['beam_size']} "
+          f"(WER {best['wer']:.1%}, RTF {best['rtf']:.3f}) -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
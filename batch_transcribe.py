@@ -0,0 +1,274 @@
+# batch_transcribe.py
+# Transcribes a directory of recorded WAV files (commands, meetings) in parallel.
+#
+#   python batch_transcribe.py recordings/ --out transcripts.jsonl --workers 4 --cpu-threads 2
+#
+# Files are memory-mapped, never read whole. Each file is cut into chunks of
+# at most --max-chunk seconds at pauses found by the VAD, and the chunks are
+# spread over a pool of processes, each with its own faster-whisper model.
+# Every output line is one segment:
+#   {"file": ..., "chunk": [start, end], "start": 12.34, "end": 15.02, "text": ...}
+#
+# A finished chunk is recorded in <out>.manifest after its segments were
+# written. Running the same command again skips the chunks in the manifest
+# and drops output lines of chunks that were not completed, so after a crash
+# no audio is transcribed twice. A file that changed since (size or mtime)
+# loses its old lines and manifest entries and is transcribed again.
+# --restart ignores the manifest.
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from model_profile import load_profile
+from vad import FrameVAD
+from wav_io import memmap_wav, to_float32
+
+SAMPLE_RATE = 16000
+MAX_CHUNK = 30.0        # Whisper's window
+MIN_GAP = 0.3           # shorter pauses don't split the speech
+PAD = 0.2               # audio kept around each chunk
+PLAN_BLOCK = 10.0       # seconds converted at a time when planning
+MODEL = dict(model_size_or_path="tiny.en", device="cpu", compute_type="int8")
+
+
+# ================================
+# PLANNING
+# ================================
+def speech_regions(samples, rate, min_gap=MIN_GAP):
+    """(start, end) sample ranges of speech in a memory-mapped file."""
+    vad = FrameVAD(sample_rate=rate)
+    block = int(PLAN_BLOCK * rate)
+    flags = np.concatenate([vad.process(to_float32(samples[i:i + block]))
+                            for i in range(0, len(samples), block)] or [np.zeros(0, dtype=bool)])
+    if not flags.any():
+        return []
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], flags.astype(np.int8), [0]))))
+    starts, ends = edges[::2] * vad.frame_len, edges[1::2] * vad.frame_len
+    regions = [[int(starts[0]), int(ends[0])]]
+    for start, end in zip(starts[1:], ends[1:]):
+        if start - regions[-1][1] < min_gap * rate:
+            regions[-1][1] = int(end)
+        else:
+            regions.append([int(start), int(end)])
+    return regions
+
+
+def plan_chunks(samples, rate, max_chunk=MAX_CHUNK, pad=PAD):
+    """Packs speech regions into chunks of at most `max_chunk` seconds, split at pauses.
+
+    Chunks never overlap: `pad` is only added at pauses (at most half of the
+    pause), not where a long region was cut hard, so no word is transcribed
+    in two chunks.
+    """
+    pad = int(pad * rate)
+    limit = int(max_chunk * rate) - 2 * pad
+    chunks = []     # [start, end, cut at start, cut at end]
+    for start, end in speech_regions(samples, rate):
+        # regions longer than a chunk are cut hard
+        for s in range(start, end, limit):
+            e = min(s + limit, end)
+            if chunks and e - chunks[-1][0] <= limit:
+                chunks[-1][1] = e
+                chunks[-1][3] = e < end
+            else:
+                chunks.append([s, e, s > start, e < end])
+    n = len(samples)
+    padded = []
+    for i, (s, e, cut_start, cut_end) in enumerate(chunks):
+        if not cut_start:
+            s = max(s - pad, (chunks[i - 1][1] + s) // 2 if i else 0)
+        if not cut_end:
+            e = min(e + pad, (e + chunks[i + 1][0]) // 2 if i + 1 < len(chunks) else n)
+        padded.append((s, e))
+    return padded
+
+
+# ================================
+# WORKERS
+# ================================
+_model = None
+_files = {}
+
+
+def _init_worker(model_kwargs):
+    global _model
+    import engine
+    _model = engine.load_model(warmup=False, **model_kwargs)   # a warm-up would only delay the first chunk
+
+
+def _transcribe_chunk(path, start, end, beam_size):
+    if path not in _files:
+        if len(_files) > 8:
+            _files.clear()
+        _files[path] = memmap_wav(path)
+    samples, rate = _files[path]
+    t0 = time.perf_counter()
+    audio = to_float32(samples[start:end])      # only this chunk is read from disk
+    segments, _ = _model.transcribe(audio, language="en", beam_size=beam_size, temperature=0.0,
+                                    condition_on_previous_text=False)
+    offset = start / rate
+    lines = [{"file": path, "chunk": [start, end], "start": round(offset + s.start, 3),
+              "end": round(offset + s.end, 3), "text": s.text.strip()} for s in segments]
+    return lines, (end - start) / rate, time.perf_counter() - t0
+
+
+# ================================
+# CHECKPOINT
+# ================================
+def _signature(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def current_signatures(files):
+    # None for files that are gone: their transcripts can't be stale, they are kept
+    signatures = {}
+    for path in files:
+        try:
+            signatures[path] = _signature(path)
+        except OSError:
+            signatures[path] = None
+    return signatures
+
+
+def load_manifest(path):
+    """Completed chunks: (file, start, end) -> file signature at the time.
+
+    Entries of files that changed since are left out and pruned from the file.
+    """
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue        # last line cut off by a crash
+            done[(entry["file"], *entry["chunk"])] = entry["signature"]
+    signatures = current_signatures({key[0] for key in done})
+    fresh = {key: sig for key, sig in done.items() if signatures[key[0]] in (None, sig)}
+    if len(fresh) < len(done):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for (file, start, end), sig in fresh.items():
+                f.write(json.dumps({"file": file, "chunk": [start, end], "signature": sig}) + "\n")
+        os.replace(tmp, path)
+    return fresh
+
+
+def drop_incomplete(out_path, done):
+    # keep only output lines of chunks that made it into the manifest (already
+    # pruned of changed files by load_manifest), checked against the file as it is now
+    if not os.path.exists(out_path):
+        return
+    signatures = {}
+    tmp = out_path + ".tmp"
+    with open(out_path, encoding="utf-8") as src, open(tmp, "w", encoding="utf-8") as dst:
+        for line in src:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            key = (entry["file"], *entry["chunk"])
+            if key[0] not in signatures:
+                signatures.update(current_signatures([key[0]]))
+            if key in done and signatures[key[0]] in (None, done[key]):
+                dst.write(line)
+    os.replace(tmp, out_path)
+
+
+def find_wavs(root):
+    if os.path.isfile(root):
+        return [root]
+    paths = []
+    for folder, _, names in os.walk(root):
+        paths += [os.path.join(folder, n) for n in names if n.lower().endswith(".wav")]
+    return sorted(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel batch transcription of WAV files")
+    parser.add_argument("source", help="WAV file or directory (searched recursively)")
+    parser.add_argument("--out", default="transcripts.jsonl")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--cpu-threads", type=int, default=2, help="threads per worker model")
+    parser.add_argument("--model", help="overrides model_profile.json")
+    parser.add_argument("--device")
+    parser.add_argument("--compute-type")
+    parser.add_argument("--beam-size", type=int)
+    parser.add_argument("--max-chunk", type=float, default=MAX_CHUNK)
+    parser.add_argument("--restart", action="store_true", help="ignore the manifest, start over")
+    args = parser.parse_args()
+    # threads are split between workers here, so the profile's cpu_threads is not used
+    profile = load_profile(model=MODEL["model_size_or_path"], device=MODEL["device"],
+                           compute_type=MODEL["compute_type"], beam_size=5)
+    for key in ("model", "device", "compute_type", "beam_size"):
+        if getattr(args, key) is None:
+            setattr(args, key, profile[key])
+
+    manifest_path = args.out + ".manifest"
+    if args.restart:
+        for p in (args.out, manifest_path):
+            if os.path.exists(p):
+                os.remove(p)
+    done = load_manifest(manifest_path)
+    drop_incomplete(args.out, done)
+
+    jobs, skipped = [], 0
+    for path in find_wavs(args.source):
+        try:
+            samples, rate = memmap_wav(path)
+        except ValueError as e:
+            print("Skipping:", e)
+            continue
+        if rate != SAMPLE_RATE:
+            print(f"Skipping {path}: {rate} Hz, expected {SAMPLE_RATE} Hz")
+            continue
+        signature = _signature(path)
+        for start, end in plan_chunks(samples, rate, args.max_chunk):
+            if done.get((path, start, end)) == signature:
+                skipped += 1
+            else:
+                jobs.append((path, start, end, signature))
+        del samples
+    total_audio = sum(end - start for _, start, end, _ in jobs) / SAMPLE_RATE
+    print(f"{len(jobs)} chunks to transcribe ({total_audio:.1f} s of speech), "
+          f"{skipped} already done, {args.workers} worker(s) x {args.cpu_threads} thread(s)")
+    if not jobs:
+        return
+
+    model_kwargs = dict(model_size_or_path=args.model, device=args.device,
+                        compute_type=args.compute_type, cpu_threads=args.cpu_threads)
+    t0 = time.perf_counter()
+    audio_done = 0.0
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(model_kwargs,)) as pool, \
+            open(args.out, "a", encoding="utf-8") as out, \
+            open(manifest_path, "a", encoding="utf-8") as manifest:
+        futures = {pool.submit(_transcribe_chunk, path, start, end, args.beam_size): (path, start, end, sig)
+                   for path, start, end, sig in jobs}
+        for i, future in enumerate(as_completed(futures), 1):
+            path, start, end, signature = futures[future]
+            try:
+                lines, seconds, _ = future.result()
+            except Exception as e:
+                print(f"Failed {path} [{start}:{end}]: {e!r}")
+                continue
+            out.writelines(json.dumps(line) + "\n" for line in lines)
+            out.flush()
+            os.fsync(out.fileno())     # segments are on disk before the chunk counts as done
+            manifest.write(json.dumps({"file": path, "chunk": [start, end], "signature": signature}) + "\n")
+            manifest.flush()
+            audio_done += seconds
+            elapsed = time.perf_counter() - t0
+            print(f"[{i}/{len(jobs)}] {os.path.basename(path)} {start / SAMPLE_RATE:.1f}-"
+                  f"{end / SAMPLE_RATE:.1f}s  ({audio_done / elapsed:.1f}x real time)")
+    print(f"Done: {audio_done:.1f} s of audio in {time.perf_counter() - t0:.1f} s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+# benchmarks.py
+# Micro-benchmarks for the components on the real-time audio path.
+#
+#   python benchmarks.py                     run, check budgets and the baseline
+#   python benchmarks.py --save-baseline     store the current numbers as baseline
+#   python benchmarks.py --baseline other.json   compare against another baseline file
+#   python benchmarks.py -k vad              only benchmarks whose name contains "vad"
+#
+# Everything runs on synthetic audio, without a model or microphone. Each
+# benchmark processes one second of audio per call; the reported time is the
+# median over the repeats, as a share of real time (1 s). A benchmark fails
+# when it uses more than its share of the real-time budget, or when its time
+# or peak allocation grew by more than --tolerance compared to the baseline
+# file (slowdowns under MIN_SLOWDOWN of real time are noise). The "legacy"
+# rows time the old code paths for comparison; they have no budget and only
+# show their change against the baseline.
+#
+# bench_baseline.json is committed: it was produced by --save-baseline on the
+# reference machine, so a regression shows up on the next run. Rows marked
+# "optional" need a package that is not in requirements.txt (scipy) and are
+# skipped without it.
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+BASELINE_FILE = "bench_baseline.json"
+MIN_SLOWDOWN = 5e-5     # 0.005% of real time: timer noise on the microsecond rows
+
+BENCHMARKS = []
+
+
+def bench(name, budget=None, optional=False):
+    """Registers a setup function returning a callable that handles 1 s of audio.
+    budget is the allowed share of one core in real time (0.01 = 1%); optional
+    benchmarks need a package outside requirements.txt."""
+    def register(setup):
+        BENCHMARKS.append((name, budget, optional, setup))
+        return setup
+    return register
+
+
+# ================================
+# SYNTHETIC AUDIO
+# ================================
+def synthetic_audio(seconds=1.0, sample_rate=SAMPLE_RATE, seed=0):
+    # voiced-like harmonics with syllable-rate modulation over background noise
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    voice = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 6))
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t)) * (t % 2 < 1)
+    return (0.1 * envelope * voice + 0.003 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+AUDIO = synthetic_audio()
+
+
+def blocks(audio, block_seconds):
+    n = int(block_seconds * SAMPLE_RATE)
+    return [audio[i:i + n] for i in range(0, len(audio) - n + 1, n)]
+
+
+# ================================
+# CAPTURE
+# ================================
+@bench("legacy.callback_copy[20ms]")
+def _capture_small():
+    indata = [b[:, None].astype(np.float32) for b in blocks(AUDIO, 0.02)]
+
+    def run():
+        for block in indata:
+            block.copy().astype(np.float32).flatten()
+    return run
+
+
+@bench("legacy.callback_copy[500ms]")
+def _capture_large():
+    indata = [b[:, None].astype(np.float32) for b in blocks(AUDIO, 0.5)]
+
+    def run():
+        for block in indata:
+            block.copy().astype(np.float32).flatten()
+    return run
+
+
+@bench("capture.pool_callback[20ms]", budget=0.005)
+def _capture_pool():
+    from capture import AudioCapture
+    from types import SimpleNamespace
+    capture = AudioCapture(SAMPLE_RATE, blocksize=int(0.02 * SAMPLE_RATE))
+    indata = [b[:, None].astype(np.float32) for b in blocks(AUDIO, 0.02)]
+    info = SimpleNamespace(currentTime=0.0)
+    status = SimpleNamespace(input_overflow=False)
+
+    def run():
+        for block in indata:
+            capture._callback(block, len(block), info, status)
+            capture.release(capture.get())
+    return run
+
+
+# ================================
+# BUFFERING
+# ================================
+@bench("buffer.ring_write[500ms]", budget=0.005)
+def _ring_write():
+    from ring_buffer import RingBuffer
+    ring = RingBuffer(10 * SAMPLE_RATE)
+    chunks = blocks(AUDIO, 0.5)
+
+    def run():
+        for chunk in chunks:
+            ring.write(chunk)
+    return run
+
+
+@bench("legacy.deque_extend[500ms]")
+def _deque_extend():
+    buffer = deque(maxlen=3 * SAMPLE_RATE)
+    chunks = blocks(AUDIO, 0.5)
+
+    def run():
+        for chunk in chunks:
+            buffer.extend(chunk)
+    return run
+
+
+@bench("buffer.ring_latest_3s[x2]", budget=0.005)
+def _ring_latest():
+    from ring_buffer import RingBuffer
+    ring = RingBuffer(10 * SAMPLE_RATE)
+    for _ in range(4):
+        ring.write(AUDIO)
+
+    def run():
+        # two wake-window reads per second of audio
+        for _ in range(2):
+            ring.write(AUDIO[:SAMPLE_RATE // 2])
+            ring.latest(3 * SAMPLE_RATE)
+    return run
+
+
+@bench("legacy.deque_to_array_3s[x2]")
+def _deque_to_array():
+    buffer = deque(np.tile(AUDIO, 3).tolist(), maxlen=3 * SAMPLE_RATE)
+
+    def run():
+        for _ in range(2):
+            np.array(buffer, dtype=np.float32)
+    return run
+
+
+@bench("legacy.command_list_to_array[5s]")
+def _command_list_to_array():
+    command_buffer = list(np.tile(AUDIO, 5))
+
+    def run():
+        np.array(command_buffer, dtype=np.float32)
+    return run
+
+
+@bench("buffer.command_recorder[500ms]", budget=0.005)
+def _command_recorder():
+    from command_recorder import CommandRecorder
+    recorder = CommandRecorder(15.0, SAMPLE_RATE)
+    chunks = blocks(AUDIO, 0.5)
+
+    def run():
+        # append one second, then hand the recording to the decoder
+        if recorder.duration > 10:
+            recorder.clear()
+        for chunk in chunks:
+            recorder.append(chunk)
+        recorder.view()
+    return run
+
+
+# ================================
+# VAD / WAKE
+# ================================
+@bench("legacy.is_speech[500ms]")
+def _legacy_vad():
+    chunks = blocks(AUDIO, 0.5)
+
+    def run():
+        for chunk in chunks:
+            np.mean(np.abs(chunk)) > 0.01
+    return run
+
+
+@bench("vad.frame_vad[500ms]", budget=0.01)
+def _frame_vad():
+    from vad import FrameVAD
+    vad = FrameVAD(sample_rate=SAMPLE_RATE)
+    chunks = blocks(AUDIO, 0.5)
+
+    def run():
+        for chunk in chunks:
+            vad.process(chunk)
+    return run
+
+
+@bench("wake.keyword_spotter[x2]", budget=0.05)
+def _keyword_spotter():
+    from keyword_spotter import KeywordSpotter
+    spotter = KeywordSpotter()
+    spotter.enroll([synthetic_audio(0.7, seed=i) for i in range(3)])
+    window = np.tile(AUDIO, 2)[:spotter.window_samples]
+
+    def run():
+        for _ in range(2):
+            spotter.score(window)
+    return run
+
+
+# ================================
+# COMMAND MATCHING
+# ================================
+TRANSCRIPTS = ["open chrome", "please launch the firefox browser", "deschide terminalul",
+               "play something on spotify", "what time is it"]
+
+
+@bench("legacy.find_best_match", budget=None)
+def _find_best_match():
+    from command_matcher import load_commands, find_best_match
+    commands = load_commands("commands.csv", verbose=False)
+
+    def run():
+        for text in TRANSCRIPTS:
+            find_best_match(text, commands)
+    return run
+
+
+@bench("match.command_index", budget=0.01)
+def _command_index():
+    from command_matcher import CommandIndex
+    index = CommandIndex("commands.csv")
+
+    def run():
+        # uncached scoring, as for a new transcript
+        index._scores(TRANSCRIPTS)
+    return run
+
+
+# ================================
+# RESAMPLING
+# ================================
+@bench("legacy.scipy_resample_48k[1s]", optional=True)
+def _scipy_resample():
+    from scipy.signal import resample
+    audio48 = np.repeat(AUDIO, 3)
+
+    def run():
+        resample(audio48, SAMPLE_RATE)
+    return run
+
+
+def _polyphase(rate, block_seconds):
+    from resampler import Resampler
+    audio = np.repeat(AUDIO, 3) if rate == 48000 else synthetic_audio(sample_rate=rate)
+    n = int(block_seconds * rate)
+    chunks = [audio[i:i + n] for i in range(0, len(audio) - n + 1, n)]
+    resampler = Resampler(rate, SAMPLE_RATE, max_block=n)
+    out = np.empty(resampler.output_size(n), dtype=np.float32)
+
+    def run():
+        # one second of capture callbacks, as in AudioCapture(device_rate=rate)
+        for chunk in chunks:
+            resampler.process(chunk, out)
+    return run
+
+
+@bench("resample.polyphase_48k[30ms]", budget=0.01)
+def _polyphase_48k():
+    return _polyphase(48000, 0.03)
+
+
+@bench("resample.polyphase_44k1[30ms]", budget=0.01)
+def _polyphase_44k1():
+    return _polyphase(44100, 0.03)
+
+
+# ================================
+# RUNNER
+# ================================
+def measure(setup, repeats):
+    run = setup()
+    run()   # warm up caches, lazy imports and first-call allocations
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return float(np.median(times)), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audio hot-path micro-benchmarks")
+    parser.add_argument("-k", default="", help="only run benchmarks containing this text")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results, failures = {}, []
+    print(f"{'benchmark':<36}{'% of RT':>9}{'budget':>9}{'peak KiB':>10}{'vs base':>9}")
+    for name, budget, optional, setup in BENCHMARKS:
+        if args.k not in name:
+            continue
+        try:
+            seconds, peak = measure(setup, args.repeats)
+        except ImportError as e:
+            print(f"{name:<36}  skipped ({e})")
+            continue
+        results[name] = {"seconds_per_audio_second": seconds, "peak_bytes": peak}
+        if optional:
+            results[name]["optional"] = True
+
+        notes = []
+        if budget is not None and seconds > budget:
+            notes.append("OVER BUDGET")
+        change = ""
+        if name in baseline:
+            base = baseline[name]["seconds_per_audio_second"]
+            ratio = seconds / base - 1.0
+            change = f"{ratio:+.0%}"
+        if name in baseline and budget is not None:
+            if ratio > args.tolerance and seconds - base > MIN_SLOWDOWN:
+                notes.append("SLOWER THAN BASELINE")
+            if peak > baseline[name]["peak_bytes"] * (1.0 + args.tolerance) + 4096:
+                notes.append("ALLOCATES MORE THAN BASELINE")
+        if notes:
+            failures.append(name)
+        budget_text = f"{budget:.1%}" if budget is not None else "-"
+        print(f"{name:<36}{seconds:>9.3%}{budget_text:>9}{peak / 1024:>10.1f}{change:>9}  {' '.join(notes)}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    if failures:
+        print(f"{len(failures)} benchmark(s) failed: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
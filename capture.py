@@ -0,0 +1,193 @@
+# capture.py
+# Microphone capture with a preallocated frame pool.
+#
+# The PortAudio callback copies each block exactly once, into a free slot of a
+# fixed (slots x blocksize) float32 array, and hands the slot index to the
+# consumer. Nothing is allocated per block on the real-time thread, so small
+# blocks (20-50 ms) don't cause GC jitter and input overflows.
+#
+#   capture = AudioCapture(16000, blocksize=480)
+#   with capture:
+#       slot = capture.get()
+#       process(capture.block(slot))   # view into the pool
+#       capture.release(slot)          # give the slot back
+#
+# device_rate="native" opens the microphone at a rate it supports natively
+# (sample_rate if it can, else its default 44.1/48 kHz) and converts every
+# block to `sample_rate` in the callback with a streaming polyphase
+# resampler (resampler.py), writing into the slot. device="auto" picks the
+# best input; both come from the cached probe in device_probe.py.
+#
+# AsyncAudioCapture hands the slots to an asyncio loop instead:
+#   slot = await capture.aget()
+import asyncio
+import queue
+import time
+from collections import deque
+
+import numpy as np
+
+from device_probe import input_settings
+from resampler import Resampler
+
+
+class AudioCapture:
+    def __init__(self, sample_rate=16000, blocksize=480, device=None, slots=None, channels=1,
+                 pool_seconds=2.0, device_rate=None):
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize          # samples per block at sample_rate
+        self.device = device                # index, name, None = system default, "auto" = best input
+        self.channels = channels
+        self.device_rate = device_rate      # None = sample_rate, "native" = a rate the device supports
+        self.resampler = None
+        # enough slots for `pool_seconds` of audio waiting for the consumer; a
+        # resampled block can come out up to 2 samples longer
+        slots = slots or max(4, int(pool_seconds * sample_rate / blocksize))
+        self.pool = np.zeros((slots, blocksize + 2), dtype=np.float32)
+        self.lengths = np.zeros(slots, dtype=np.int64)
+        self.positions = np.zeros(slots, dtype=np.int64)   # sample clock at the start of each block
+        self.stamps = np.zeros(slots)         # perf_counter() when the callback filled the slot
+        self.free = deque(range(slots))       # popleft/append are atomic
+        self.ready = queue.SimpleQueue()      # filled slot indices, None = stopped
+        self.position = 0
+        self.stream = None
+
+        # metrics
+        self.callbacks = 0
+        self.overflows = 0        # PortAudio reported input overflow
+        self.late = 0             # callback came more than 1.5 blocks after the previous one
+        self.dropped = 0          # no free slot: the consumer fell behind
+        self.last_callback = None
+        self.late_after = 1.5 * blocksize / sample_rate
+
+    # ---- real-time thread ----
+    def _callback(self, indata, frames, time_info, status):
+        self.callbacks += 1
+        if status.input_overflow:
+            self.overflows += 1
+        now = time_info.currentTime
+        if self.last_callback is not None and now - self.last_callback > self.late_after:
+            self.late += 1
+        self.last_callback = now
+
+        if not self.free:
+            self.dropped += 1
+            if self.resampler is not None:
+                frames = self.resampler.process(indata[:, 0])    # keep the filter state continuous
+            self.position += frames
+            return
+        slot = self.free.popleft()
+        if self.resampler is not None:
+            frames = self.resampler.process(indata[:, 0], self.pool[slot])
+        else:
+            np.copyto(self.pool[slot, :frames], indata[:, 0])
+        self.lengths[slot] = frames
+        self.positions[slot] = self.position
+        self.stamps[slot] = time.perf_counter()
+        self.position += frames
+        self.ready.put(slot)
+
+    # ---- consumer side ----
+    def get(self, timeout=None):
+        """Next filled slot index, or None once the capture was stopped."""
+        try:
+            return self.ready.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def block(self, slot):
+        return self.pool[slot, :self.lengths[slot]]
+
+    def delay(self, slot):
+        # seconds the block waited between the callback and the consumer
+        return time.perf_counter() - self.stamps[slot]
+
+    def release(self, slot):
+        self.free.append(slot)
+
+    def flush(self):
+        # drop the blocks nobody has read yet
+        while True:
+            try:
+                slot = self.ready.get_nowait()
+            except queue.Empty:
+                return
+            if slot is None:
+                self.ready.put(None)
+                return
+            self.release(slot)
+
+    def stats(self):
+        return {
+            "callbacks": self.callbacks,
+            "overflows": self.overflows,
+            "late": self.late,
+            "dropped": self.dropped,
+            "free_slots": len(self.free),
+            "slots": len(self.pool),
+            "device_rate": self.resampler.rate_in if self.resampler is not None else self.sample_rate,
+        }
+
+    # ---- stream ----
+    def start(self):
+        import sounddevice as sd    # only needed once a stream is opened
+        rate = self.device_rate or self.sample_rate
+        if self.device == "auto" or rate == "native":
+            device, native = input_settings(self.device, self.sample_rate)
+            self.device = device
+            if rate == "native":
+                rate = native
+        blocksize = self.blocksize
+        if rate != self.sample_rate:
+            # the same block duration at the device rate
+            blocksize = round(self.blocksize * rate / self.sample_rate)
+            self.resampler = Resampler(rate, self.sample_rate, max_block=blocksize)
+            print(f"Capturing at {rate} Hz, resampled to {self.sample_rate} Hz")
+        self.stream = sd.InputStream(
+            samplerate=rate,
+            channels=self.channels,
+            dtype="float32",
+            callback=self._callback,
+            blocksize=blocksize,
+            device=self.device,
+        )
+        self.stream.start()
+        return self
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+        self.ready.put(None)    # wake up the consumer
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _LoopQueue:
+    # put() from the PortAudio thread lands on an asyncio.Queue in the loop's thread
+    def __init__(self, loop, queue):
+        self.loop = loop
+        self.queue = queue
+
+    def put(self, slot):
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, slot)
+
+
+class AsyncAudioCapture(AudioCapture):
+    """AudioCapture for an asyncio loop: the consumer awaits slots, no thread blocks on them."""
+
+    def start(self):
+        # the queue can't overflow: there are never more filled slots than the pool holds
+        self.queue = asyncio.Queue(maxsize=len(self.pool) + 1)
+        self.ready = _LoopQueue(asyncio.get_running_loop(), self.queue)
+        return super().start()
+
+    async def aget(self):
+        """Next filled slot index, or None once the capture was stopped."""
+        return await self.queue.get()
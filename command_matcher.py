@@ -1,16 +1,20 @@
 # command_matcher.py
 import csv
-from rapidfuzz import process, fuzz
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+from rapidfuzz import process, fuzz, utils
 
-import csv
 
-def load_commands(filename="commands.csv"):
+def load_commands(filename="commands.csv", verbose=True):
     commands = {}
-    print(f"Loading from {filename} ...")
+    if verbose:
+        print(f"Loading from {filename} ...")
 
     with open(filename, "r", encoding="utf-8-sig", newline='') as f:
         reader = csv.DictReader(f)
-        print("CSV fieldnames:", reader.fieldnames)  # debug
         for row in reader:
             if not row.get("command") or not row.get("phrase"):
                 continue
@@ -18,7 +22,8 @@ def load_commands(filename="commands.csv"):
             phrase = row["phrase"].strip().lower()
             commands.setdefault(cmd, []).append(phrase)
 
-    print("Loaded commands:", commands)
+    if verbose:
+        print(f"Loaded {sum(map(len, commands.values()))} phrases for {len(commands)} commands")
     return commands
 
 def find_best_match(text, commands, threshold=70):
@@ -31,3 +36,208 @@ def find_best_match(text, commands, threshold=70):
             return all_phrases[best_phrase], score
 
     return None  # ensures you can safely check before unpacking
+
+
+def _trigram_keys(text):
+    # unique character trigrams of a normalized phrase, packed into int64
+    # (three 21-bit code points), padded so short words still have trigrams
+    padded = f"  {text} "
+    codes = np.frombuffer(padded.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    if len(codes) < 3:
+        return np.zeros(0, dtype=np.int64)
+    return np.unique((codes[:-2] << 42) | (codes[1:-1] << 21) | codes[2:])
+
+
+class TrigramIndex:
+    """Character-trigram inverted index in CSR form.
+
+    keys[i] is a trigram, postings[offsets[i]:offsets[i + 1]] the ids of the
+    phrases containing it. query() counts shared trigrams with one bincount
+    and returns a shortlist ranked by Dice overlap.
+    """
+
+    def __init__(self, keys, offsets, postings, sizes):
+        self.keys = keys            # int64, sorted
+        self.offsets = offsets      # int64, len(keys) + 1
+        self.postings = postings    # int32 phrase ids
+        self.sizes = sizes          # int32 trigram count per phrase
+
+    @classmethod
+    def build(cls, phrases):
+        per_phrase = [_trigram_keys(p) for p in phrases]
+        sizes = np.array([len(k) for k in per_phrase], dtype=np.int32)
+        all_keys = np.concatenate(per_phrase) if per_phrase else np.zeros(0, dtype=np.int64)
+        ids = np.repeat(np.arange(len(phrases), dtype=np.int32), sizes)
+        order = np.lexsort((ids, all_keys))
+        all_keys, ids = all_keys[order], ids[order]
+        keys, starts = np.unique(all_keys, return_index=True)
+        offsets = np.append(starts, len(all_keys)).astype(np.int64)
+        return cls(keys, offsets, ids, sizes)
+
+    def query(self, text, shortlist=200):
+        query = _trigram_keys(text)
+        if len(query) == 0 or len(self.keys) == 0:
+            return np.zeros(0, dtype=np.intp)
+        pos = np.searchsorted(self.keys, query)
+        found = pos < len(self.keys)
+        pos, query_found = pos[found], query[found]
+        pos = pos[self.keys[pos] == query_found]
+        if len(pos) == 0:
+            return np.zeros(0, dtype=np.intp)
+        hits = np.concatenate([self.postings[self.offsets[i]:self.offsets[i + 1]] for i in pos])
+        shared = np.bincount(hits, minlength=len(self.sizes))
+        candidates = np.flatnonzero(shared)
+        dice = 2.0 * shared[candidates] / (len(query) + self.sizes[candidates])
+        if len(candidates) > shortlist:
+            top = np.argpartition(-dice, shortlist)[:shortlist]
+            candidates, dice = candidates[top], dice[top]
+        return candidates[np.argsort(-dice)]
+
+    def save(self, path, signature):
+        np.savez(path, keys=self.keys, offsets=self.offsets, postings=self.postings,
+                 sizes=self.sizes, signature=np.array(signature, dtype=np.int64))
+
+    @classmethod
+    def load(cls, path, signature):
+        # None if the file is missing or was built from a different CSV
+        try:
+            with np.load(path) as data:
+                if data["signature"].tolist() != list(signature):
+                    return None
+                return cls(data["keys"], data["offsets"], data["postings"], data["sizes"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+class CommandIndex:
+    """Precompiled command phrases, scored all at once with rapidfuzz cdist.
+
+    Phrases are normalized once at load time and grouped by command, so the
+    per-command best score is a single reduceat over the score matrix.
+    commands.csv is reloaded when its mtime changes (checked at most every
+    `check_interval` seconds), so edits apply without restarting the process.
+
+    Large catalogs (more than `prefilter_min` phrases) are first narrowed down
+    to `shortlist` candidates with a trigram index, which is saved next to the
+    CSV (<name>.trigrams.npz) so the next startup doesn't rebuild it.
+    """
+
+    def __init__(self, filename="commands.csv", scorer=fuzz.token_sort_ratio,
+                 cache_size=256, check_interval=1.0, prefilter_min=2000, shortlist=200):
+        self.filename = filename
+        self.scorer = scorer
+        self.cache_size = cache_size
+        self.check_interval = check_interval
+        self.prefilter_min = prefilter_min
+        self.shortlist = shortlist
+        self.cache = OrderedDict()
+        self.mtime = None
+        self.failed_mtime = None    # a version of the file that didn't load, reported once
+        self.last_check = 0.0
+        self._load()
+
+    def _load(self):
+        st = os.stat(self.filename)
+        commands = load_commands(self.filename, verbose=False)
+        self.mtime = st.st_mtime
+        self.commands = commands
+        self.names = list(commands)                     # command ids, in group order
+        self.phrases = [utils.default_process(p) for name in self.names for p in commands[name]]
+        counts = [len(commands[name]) for name in self.names]
+        self.group_starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.intp)
+        self.phrase_command = np.repeat(np.arange(len(self.names)), counts)
+        self.trigrams = None
+        if len(self.phrases) > self.prefilter_min:
+            self.trigrams = self._load_trigrams((st.st_mtime_ns, st.st_size))
+        self.cache.clear()
+
+    def _load_trigrams(self, signature):
+        path = self.filename + ".trigrams.npz"
+        index = TrigramIndex.load(path, signature)
+        if index is None:
+            index = TrigramIndex.build(self.phrases)
+            try:
+                index.save(path, signature)
+            except OSError as e:
+                print("Could not save trigram index:", e)
+        return index
+
+    def reload_if_changed(self):
+        now = time.monotonic()
+        if now - self.last_check < self.check_interval:
+            return False
+        self.last_check = now
+        try:
+            mtime = os.stat(self.filename).st_mtime
+        except OSError:
+            return False    # file being replaced: keep the current index
+        if mtime == self.mtime:
+            return False
+        try:
+            self._load()
+        except (OSError, ValueError, csv.Error) as e:
+            # half-written or malformed: keep matching against the previous commands
+            # and try again on the next check
+            if mtime != self.failed_mtime:
+                self.failed_mtime = mtime
+                print(f"Could not reload {self.filename}, keeping the previous commands: {e}")
+            return False
+        print(f"Reloaded {self.filename}: {len(self.phrases)} phrases for {len(self.names)} commands")
+        return True
+
+    def _scores(self, texts):
+        # best phrase score per command, shape (len(texts), len(commands))
+        queries = [utils.default_process(t) for t in texts]
+        if self.trigrams is not None:
+            return np.stack([self._shortlist_scores(q) for q in queries])
+        matrix = process.cdist(queries, self.phrases, scorer=self.scorer, workers=1)
+        return np.maximum.reduceat(matrix, self.group_starts, axis=1)
+
+    def _shortlist_scores(self, query):
+        # fuzzy scores only for the phrases sharing the most trigrams with the query
+        row = np.zeros(len(self.names), dtype=np.float32)
+        candidates = self.trigrams.query(query, self.shortlist)
+        if len(candidates):
+            scores = process.cdist([query], [self.phrases[i] for i in candidates],
+                                   scorer=self.scorer, workers=1)[0]
+            np.maximum.at(row, self.phrase_command[candidates], scores)
+        return row
+
+    def _ranked(self, scores, n):
+        order = np.argsort(-scores)[:n + 1]
+        ranked = []
+        for i, idx in enumerate(order[:n]):
+            runner_up = scores[order[i + 1]] if i + 1 < len(order) else 0.0
+            ranked.append((self.names[idx], float(scores[idx]), float(scores[idx] - runner_up)))
+        return ranked
+
+    def match(self, text, n=3):
+        """Top-n commands for a transcript as (command, score, margin) tuples,
+        where margin is the distance to the next command."""
+        self.reload_if_changed()
+        if not self.names:
+            return []
+        key = (utils.default_process(text), n)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        result = self._ranked(self._scores([text])[0], n)
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    def match_batch(self, texts, n=3):
+        # n-best for several transcripts with one cdist call
+        self.reload_if_changed()
+        if not self.names or not texts:
+            return [[] for _ in texts]
+        return [self._ranked(row, n) for row in self._scores(texts)]
+
+    def best(self, text, threshold=70):
+        # same contract as find_best_match(): (command, score) or None
+        ranked = self.match(text, n=1)
+        if ranked and ranked[0][1] >= threshold:
+            return ranked[0][0], ranked[0][1]
+        return None
@@ -0,0 +1,68 @@
+# command_recorder.py
+# Preallocated storage for the audio of one voice command.
+#
+# The buffer is allocated once for the longest allowed command, appends are
+# slice copies and the decoder gets a view of the recorded part. With
+# dtype="int16" the samples are stored as 16-bit PCM, which halves the memory
+# when many sessions are recorded at once; view() then returns a float32 copy.
+# Both directions use the scale 32768 (+1.0 clips to 32767), rounded, so a
+# round trip keeps the level; the conversion goes through a scratch buffer
+# that only grows when a longer chunk than before arrives.
+import numpy as np
+
+
+class CommandRecorder:
+    def __init__(self, max_seconds=15.0, sample_rate=16000, dtype="float32"):
+        if dtype not in ("float32", "int16"):
+            raise ValueError(f"unsupported dtype {dtype!r}, use 'float32' or 'int16'")
+        self.sample_rate = sample_rate
+        self.data = np.zeros(int(max_seconds * sample_rate), dtype=dtype)
+        self.length = 0
+        self.scratch = np.zeros(0, dtype=np.float32)    # int16 mode: the scaled chunk
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def capacity(self):
+        return len(self.data)
+
+    @property
+    def full(self):
+        return self.length >= len(self.data)
+
+    @property
+    def duration(self):
+        return self.length / self.sample_rate
+
+    def append(self, chunk):
+        # copies as much of the chunk as still fits; returns the samples stored
+        n = min(len(chunk), len(self.data) - self.length)
+        if n <= 0:
+            return 0
+        target = self.data[self.length:self.length + n]
+        if self.data.dtype == np.int16:
+            if len(self.scratch) < n:
+                self.scratch = np.zeros(n, dtype=np.float32)
+            scaled = self.scratch[:n]
+            np.multiply(chunk[:n], 32768.0, out=scaled)
+            np.clip(scaled, -32768.0, 32767.0, out=scaled)
+            np.rint(scaled, out=scaled)
+            np.copyto(target, scaled, casting="unsafe")
+        else:
+            target[:] = chunk[:n]
+        self.length += n
+        return n
+
+    def view(self):
+        """The recorded audio as float32: a zero-copy view, or a converted copy in int16 mode.
+
+        The view is only valid until the recorder is cleared and written again.
+        """
+        audio = self.data[:self.length]
+        if self.data.dtype == np.int16:
+            return audio.astype(np.float32) / 32768.0
+        return audio
+
+    def clear(self):
+        self.length = 0
@@ -0,0 +1,165 @@
+# device_probe.py
+# Input device capabilities, probed once and cached.
+#
+#   device, rate = input_settings("auto")      # best input and the rate to open it at
+#   python device_probe.py                     # table of inputs; --refresh probes again
+#
+# Probing opens nothing, but check_input_settings() for every rate of every
+# device takes a while on ALSA, so the results are kept in audio_devices.json,
+# keyed by "host API: device name" (indices change when devices come and go).
+# The cache holds a signature of the device list; when a device is added or
+# removed, the whole list is probed again on the next start.
+#
+# The best input runs at 16 kHz by default, else accepts 16 kHz, else needs
+# resampling; within that, the lowest reported input latency wins, then the
+# system default input.
+import argparse
+import hashlib
+import json
+import os
+import time
+
+CACHE_FILE = os.environ.get("AUDIO_DEVICE_CACHE", "audio_devices.json")
+RATES = [16000, 48000, 44100, 32000, 22050, 8000]
+SAMPLE_RATE = 16000
+
+
+def _key(device, hostapis):
+    return f"{hostapis[device['hostapi']]['name']}: {device['name']}"
+
+
+def signature(devices, hostapis):
+    # changes when an input is added, removed or its channel count changes, not when indices shift
+    inputs = sorted(f"{_key(d, hostapis)}/{d['max_input_channels']}" for d in devices
+                    if d["max_input_channels"] > 0)
+    return hashlib.sha1("\n".join(inputs).encode()).hexdigest()
+
+
+def probe_device(sd, index, device, hostapis):
+    """Supported rates (mono float32), channels and latencies of one input."""
+    rates = []
+    for rate in RATES:
+        try:
+            sd.check_input_settings(device=index, samplerate=rate, channels=1, dtype="float32")
+            rates.append(rate)
+        except Exception:
+            pass
+    return {
+        "name": device["name"],
+        "hostapi": hostapis[device["hostapi"]]["name"],
+        "channels": device["max_input_channels"],
+        "default_rate": int(device["default_samplerate"]),
+        "rates": rates,
+        "low_latency": device["default_low_input_latency"],
+        "high_latency": device["default_high_input_latency"],
+    }
+
+
+def load_devices(refresh=False, path=None, verbose=True):
+    """{key: capabilities} of every input, plus the current index of each.
+
+    Uses the cache unless the device list changed (or refresh=True).
+    """
+    import sounddevice as sd
+    path = path or CACHE_FILE
+    devices = sd.query_devices()
+    hostapis = sd.query_hostapis()
+    sig = signature(devices, hostapis)
+
+    cached = None
+    if not refresh:
+        try:
+            with open(path, encoding="utf-8") as f:
+                cached = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Ignoring device cache {path}: {e}")
+    if cached and cached.get("signature") == sig:
+        inputs = cached["devices"]
+    else:
+        t0 = time.perf_counter()
+        inputs = {_key(d, hostapis): probe_device(sd, i, d, hostapis)
+                  for i, d in enumerate(devices) if d["max_input_channels"] > 0}
+        if verbose:
+            print(f"Probed {len(inputs)} input device(s) in {time.perf_counter() - t0:.2f} s -> {path}")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"signature": sig, "probed_at": time.strftime("%Y-%m-%d %H:%M:%S"), "devices": inputs},
+                      f, indent=2)
+
+    # indices are not cached: they are looked up by key every time
+    for i, d in enumerate(devices):
+        key = _key(d, hostapis)
+        if key in inputs:
+            inputs[key]["index"] = i
+    try:
+        default = sd.query_devices(kind="input")
+        inputs[_key(default, hostapis)]["default"] = True
+    except Exception:
+        pass
+    return inputs
+
+
+def rank(info, sample_rate=SAMPLE_RATE):
+    # 0: runs at 16 kHz by default, 1: accepts 16 kHz, 2: needs our resampler
+    tier = 0 if info["default_rate"] == sample_rate else 1 if sample_rate in info["rates"] else 2
+    return tier, info["low_latency"], not info.get("default")
+
+
+def best_input(inputs, sample_rate=SAMPLE_RATE):
+    usable = [d for d in inputs.values() if d["rates"] and "index" in d]
+    return min(usable, key=lambda d: rank(d, sample_rate)) if usable else None
+
+
+def find_input(inputs, device):
+    # device: index, a part of the name, or None for the system default
+    for info in inputs.values():
+        if device is None and info.get("default"):
+            return info
+        if isinstance(device, int) and info.get("index") == device:
+            return info
+        if isinstance(device, str) and device.lower() in info["name"].lower():
+            return info
+    return None
+
+
+def input_settings(device="auto", sample_rate=SAMPLE_RATE):
+    """(device index, rate to open it at) for AudioCapture.
+
+    device="auto" picks the best input; an index, a name or None are looked
+    up in the cache. The rate is sample_rate when the device supports it,
+    otherwise its default rate. Without a usable probe the device is passed
+    through and the rate is sample_rate.
+    """
+    try:
+        inputs = load_devices()
+    except Exception:
+        return (None if device == "auto" else device), sample_rate
+    info = best_input(inputs, sample_rate) if device == "auto" else find_input(inputs, device)
+    if info is None:
+        return (None if device == "auto" else device), sample_rate
+    rate = sample_rate if sample_rate in info["rates"] else info["default_rate"]
+    return info["index"], rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe audio inputs and show the one the runtime picks")
+    parser.add_argument("--refresh", action="store_true", help="probe again even if the device list didn't change")
+    parser.add_argument("--cache", default=CACHE_FILE)
+    args = parser.parse_args()
+
+    inputs = load_devices(refresh=args.refresh, path=args.cache)
+    best = best_input(inputs)
+    print(f"{'':2}{'index':>5}  {'device':<48}{'ch':>3}{'default':>9}{'latency':>9}  rates")
+    for info in sorted(inputs.values(), key=lambda d: d.get("index", -1)):
+        mark = "*" if info is best else " "
+        print(f"{mark:2}{info.get('index', '-'):>5}  {info['hostapi'] + ': ' + info['name']:<48.48}"
+              f"{info['channels']:>3}{info['default_rate']:>9}{info['low_latency'] * 1000:>7.1f}ms  "
+              f"{', '.join(str(r) for r in info['rates']) or 'none'}")
+    if best is not None:
+        rate = SAMPLE_RATE if SAMPLE_RATE in best["rates"] else best["default_rate"]
+        print(f"\n* selected: {best['name']} at {rate} Hz" + (" (resampled to 16 kHz)" if rate != SAMPLE_RATE else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# endpointer.py
+# End-of-utterance detection on the sample clock.
+#
+# All positions are absolute sample indices (RingBuffer.total), so the
+# measured silence depends only on the audio, not on when a chunk happened to
+# be dequeued. The speech end comes from FrameVAD.last_speech_sample, which
+# has frame resolution and no hangover.
+#
+#   endpointer.start(wake_end)
+#   for every chunk:
+#       eou = endpointer.update(position, vad.last_speech_sample)
+#       if eou: decode(audio[eou.start:eou.end])
+#
+# The trailing-silence timeout adapts: hint() shortens it when a partial
+# decode of the speech so far already matches a command confidently, and it
+# goes back to the full timeout as soon as more speech arrives.
+from collections import namedtuple
+
+# start/end: sample positions of the utterance (end = end of the last speech
+# frame); detected: position at which the end was decided
+EndOfUtterance = namedtuple("EndOfUtterance", "start end detected reason")
+
+
+class Endpointer:
+    def __init__(self, sample_rate=16000, silence=0.8, min_silence=0.3, no_speech=1.5,
+                 max_length=15.0, guard=0.15):
+        self.sample_rate = sample_rate
+        self.silence = int(silence * sample_rate)           # timeout after uncertain speech
+        self.min_silence = int(min_silence * sample_rate)   # timeout after a confident match
+        self.no_speech = int(no_speech * sample_rate)       # grace for the speaker to start
+        self.max_length = int(max_length * sample_rate)
+        self.guard = int(guard * sample_rate)   # speech this close to the start is the wake word's tail
+        self.active = False
+        self.start_position = 0
+        self.last_speech = 0
+        self.timeout = self.silence
+
+    def start(self, position):
+        self.active = True
+        self.start_position = position
+        self.last_speech = position
+        self.timeout = self.silence
+
+    def stop(self):
+        self.active = False
+
+    @property
+    def speech_seen(self):
+        return self.last_speech > self.start_position + self.guard
+
+    def pause(self, position):
+        # trailing silence so far, in samples (0 before any speech)
+        if not self.active or not self.speech_seen:
+            return 0
+        return position - self.last_speech
+
+    def hint(self, confidence, speech_end):
+        """Shortens the timeout for speech that ends at `speech_end`.
+
+        confidence in [0, 1] moves the timeout from `silence` (0) to
+        `min_silence` (1). A hint for older speech is ignored.
+        """
+        if not self.active or speech_end != self.last_speech:
+            return
+        confidence = min(max(confidence, 0.0), 1.0)
+        self.timeout = int(self.silence - confidence * (self.silence - self.min_silence))
+
+    def update(self, position, last_speech_sample):
+        """Returns an EndOfUtterance once the utterance is over, else None."""
+        if not self.active:
+            return None
+        if last_speech_sample > self.last_speech:
+            self.last_speech = min(last_speech_sample, position)
+            self.timeout = self.silence     # new speech: earlier hints no longer apply
+
+        if position - self.start_position >= self.max_length:
+            return self._end(position, "max_length")
+        if not self.speech_seen:
+            if position - self.start_position >= self.no_speech:
+                return self._end(position, "no_speech")
+            return None
+        if position - self.last_speech >= self.timeout:
+            return self._end(position, "silence")
+        return None
+
+    def _end(self, position, reason):
+        self.active = False
+        end = self.last_speech if reason != "max_length" else position
+        return EndOfUtterance(self.start_position, end, position, reason)
@@ -0,0 +1,293 @@
+# keyword_spotter.py
+# Cheap first-stage wake-word detector: MFCC features + DTW template matching.
+#
+# A few recordings of the wake word are enrolled as templates. Every check
+# computes MFCCs for the last ~2 s of audio and looks for the best match of
+# each template anywhere in that window (subsequence DTW). Only a window whose
+# distance is below the threshold is handed to Whisper for confirmation.
+#
+# Enrollment:
+#   python keyword_spotter.py enroll garmin --count 5            (microphone)
+#   python keyword_spotter.py enroll garmin --wav rec1.wav rec2.wav ...
+#   python keyword_spotter.py calibrate --negatives noise_dir/ --far 0.5
+import argparse
+import glob
+import os
+
+import numpy as np
+
+from wav_io import read_wav
+
+SAMPLE_RATE = 16000
+TEMPLATES_FILE = "wake_templates.npz"
+EPS = 1e-10
+
+
+# ================================
+# FEATURES
+# ================================
+def _hz_to_mel(hz):
+    return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+
+def _mel_to_hz(mel):
+    return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+
+class MFCC:
+    """Log-mel / MFCC front end. Filterbank and DCT matrices are built once."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, n_fft=400, hop=160, n_mels=40,
+                 n_mfcc=13, fmin=60.0, fmax=7600.0):
+        self.n_fft = n_fft
+        self.hop = hop
+        self.n_mfcc = n_mfcc
+        self.window = np.hanning(n_fft).astype(np.float32)
+
+        freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+        hz = _mel_to_hz(np.linspace(_hz_to_mel(fmin), _hz_to_mel(fmax), n_mels + 2))
+        lower, center, upper = hz[:-2, None], hz[1:-1, None], hz[2:, None]
+        rising = (freqs - lower) / (center - lower)
+        falling = (upper - freqs) / (upper - center)
+        self.mel_fb = np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32).T  # (bins, mels)
+
+        n = np.arange(n_mels)
+        k = np.arange(n_mfcc)[:, None]
+        self.dct = (np.cos(np.pi / n_mels * (n + 0.5) * k) * np.sqrt(2.0 / n_mels)).astype(np.float32).T
+
+    def frames(self, audio):
+        audio = np.asarray(audio, dtype=np.float32)
+        if len(audio) < self.n_fft:
+            audio = np.pad(audio, (0, self.n_fft - len(audio)))
+        return np.lib.stride_tricks.sliding_window_view(audio, self.n_fft)[::self.hop]
+
+    def log_mel(self, audio):
+        spectrum = np.abs(np.fft.rfft(self.frames(audio) * self.window, axis=1)) ** 2
+        return np.log(spectrum @ self.mel_fb + EPS)
+
+    def __call__(self, audio, speech_db=25.0):
+        """Mean-normalized, unit-length MFCCs (c1..c{n_mfcc-1}) per frame.
+
+        The mean is taken over the frames within speech_db of the loudest one,
+        so a window that is mostly background normalizes like a trimmed template.
+        """
+        log_mel = self.log_mel(audio)
+        level = 10.0 / np.log(10.0) * np.log(np.exp(log_mel).sum(axis=1))
+        loud = level > level.max() - speech_db
+        mfcc = (log_mel @ self.dct)[:, 1:]
+        mfcc -= mfcc[loud].mean(axis=0)
+        mfcc /= np.linalg.norm(mfcc, axis=1, keepdims=True) + EPS
+        return mfcc
+
+    def frame_energy_db(self, audio):
+        frames = self.frames(audio)
+        return 10.0 * np.log10(np.mean(frames * frames, axis=1) + EPS)
+
+
+def trim_to_speech(audio, features, drop_db=25.0):
+    # cut leading/trailing frames more than drop_db below the loudest frame
+    energy = features.frame_energy_db(audio)
+    keep = np.flatnonzero(energy > energy.max() - drop_db)
+    if len(keep) == 0:
+        return audio
+    start = keep[0] * features.hop
+    end = keep[-1] * features.hop + features.n_fft
+    return audio[start:end]
+
+
+# ================================
+# MATCHING
+# ================================
+def subsequence_dtw(cost, stall_penalty=0.3):
+    """Best alignment of the whole template (rows) to any part of the window (columns).
+
+    Each template frame advances the window by 0, 1 or 2 frames (0 is
+    penalized), so one template row is processed for all columns at once.
+    Returns (distance per template frame, start column, end column).
+    """
+    n, m = cost.shape
+    dist = cost[0].copy()
+    start = np.arange(m)
+    cols = np.arange(m)
+    candidates = np.full((3, m), np.inf)
+    starts = np.zeros((3, m), dtype=np.int64)
+
+    for i in range(1, n):
+        candidates[0] = dist + stall_penalty
+        candidates[1, 1:] = dist[:-1]
+        candidates[2, 2:] = dist[:-2]
+        starts[0] = start
+        starts[1, 1:] = start[:-1]
+        starts[2, 2:] = start[:-2]
+        step = np.argmin(candidates, axis=0)
+        dist = cost[i] + candidates[step, cols]
+        start = starts[step, cols]
+
+    end = int(np.argmin(dist))
+    return float(dist[end]) / n, int(start[end]), end
+
+
+class KeywordSpotter:
+    """Matches enrolled templates against audio windows.
+
+    threshold is the operating point: a lower value means fewer false
+    accepts and more false rejects.
+    """
+
+    def __init__(self, templates=(), threshold=0.45, sample_rate=SAMPLE_RATE):
+        self.features = MFCC(sample_rate=sample_rate)
+        self.sample_rate = sample_rate
+        self.templates = list(templates)   # MFCC arrays (frames, coeffs)
+        self.threshold = threshold
+
+    @property
+    def window_samples(self):
+        # enough audio for the longest template said a bit slower
+        longest = max((len(t) for t in self.templates), default=100)
+        return int(longest * 1.5 * self.features.hop) + self.features.n_fft
+
+    def enroll(self, recordings):
+        for audio in recordings:
+            self.templates.append(self.features(trim_to_speech(audio, self.features)))
+
+    def score(self, audio):
+        """Returns (best distance, end sample of the match in `audio`)."""
+        if not self.templates:
+            return np.inf, None
+        window = self.features(audio)
+        best, best_end = np.inf, None
+        for template in self.templates:
+            cost = 1.0 - template @ window.T
+            distance, _, end = subsequence_dtw(cost)
+            if distance < best:
+                best, best_end = distance, end
+        end_sample = min(len(audio), best_end * self.features.hop + self.features.n_fft)
+        return best, end_sample
+
+    def detect(self, audio):
+        """Returns the end sample of a candidate hit in `audio`, or None."""
+        distance, end = self.score(audio)
+        return end if distance < self.threshold else None
+
+    def leave_one_out(self):
+        # distance of every template to the others: what a true hit scores
+        scores = []
+        for i, template in enumerate(self.templates):
+            others = [t for j, t in enumerate(self.templates) if j != i]
+            scores.append(min(subsequence_dtw(1.0 - o @ template.T)[0] for o in others))
+        return np.array(scores)
+
+    def save(self, path=TEMPLATES_FILE):
+        lengths = np.array([len(t) for t in self.templates])
+        np.savez(path, templates=np.concatenate(self.templates), lengths=lengths,
+                 threshold=self.threshold)
+
+    @classmethod
+    def load(cls, path=TEMPLATES_FILE, threshold=None):
+        data = np.load(path)
+        templates = np.split(data["templates"], np.cumsum(data["lengths"])[:-1])
+        spotter = cls(templates, threshold=float(data["threshold"]))
+        if threshold is not None:
+            spotter.threshold = threshold
+        return spotter
+
+
+def wake_word_end(segments, wake_word):
+    """End time in seconds of the last occurrence of `wake_word` in Whisper
+    segments decoded with word_timestamps=True, or None if it wasn't said.
+
+    Falls back to the end of the segment when the words carry no timestamps.
+    """
+    wake_word = wake_word.lower()
+    end = None
+    for segment in segments:
+        if wake_word not in segment.text.lower():
+            continue
+        end = segment.end
+        for word in segment.words or ():
+            if wake_word in word.word.lower():
+                end = word.end
+    return end
+
+
+def calibrate(spotter, negatives, far_per_hour=0.5, hop_seconds=0.5):
+    """Picks the threshold that gives at most `far_per_hour` false accepts on
+    the negative recordings, checked every `hop_seconds` like the live loop.
+
+    Returns (threshold, expected false-reject rate on the enrolled templates).
+    """
+    window, hop = spotter.window_samples, int(hop_seconds * spotter.sample_rate)
+    scores, hours = [], 0.0
+    for audio in negatives:
+        hours += len(audio) / spotter.sample_rate / 3600.0
+        for end in range(window, len(audio) + 1, hop):
+            scores.append(spotter.score(audio[end - window:end])[0])
+    scores = np.sort(scores)
+
+    allowed = int(far_per_hour * hours)
+    threshold = float(scores[allowed]) if allowed < len(scores) else float(scores[-1])
+    frr = float(np.mean(spotter.leave_one_out() >= threshold)) if len(spotter.templates) > 1 else 0.0
+    return threshold, frr
+
+
+# ================================
+# ENROLLMENT CLI
+# ================================
+def _record(count, seconds, word):
+    import sounddevice as sd
+    recordings = []
+    for i in range(count):
+        input(f"[{i + 1}/{count}] Press Enter and say '{word}'...")
+        audio = sd.rec(int(seconds * SAMPLE_RATE), samplerate=SAMPLE_RATE, channels=1, dtype="float32")
+        sd.wait()
+        recordings.append(audio[:, 0])
+    return recordings
+
+
+def _load_wavs(paths):
+    recordings = []
+    for path in paths:
+        audio, rate = read_wav(path)
+        if rate != SAMPLE_RATE:
+            raise ValueError(f"{path}: expected {SAMPLE_RATE} Hz, got {rate} Hz")
+        recordings.append(audio)
+    return recordings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wake-word template enrollment")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    enroll = sub.add_parser("enroll", help="record or load templates")
+    enroll.add_argument("word")
+    enroll.add_argument("--count", type=int, default=5)
+    enroll.add_argument("--seconds", type=float, default=2.0)
+    enroll.add_argument("--wav", nargs="*", help="use these recordings instead of the microphone")
+    enroll.add_argument("--margin", type=float, default=1.2,
+                        help="threshold = margin * worst leave-one-out distance")
+    enroll.add_argument("--out", default=TEMPLATES_FILE)
+
+    cal = sub.add_parser("calibrate", help="set the threshold from recordings without the wake word")
+    cal.add_argument("--negatives", required=True, help="directory of WAV files")
+    cal.add_argument("--far", type=float, default=0.5, help="false accepts per hour")
+    cal.add_argument("--templates", default=TEMPLATES_FILE)
+
+    args = parser.parse_args()
+    if args.cmd == "enroll":
+        recordings = _load_wavs(args.wav) if args.wav else _record(args.count, args.seconds, args.word)
+        spotter = KeywordSpotter()
+        spotter.enroll(recordings)
+        if len(spotter.templates) > 1:
+            spotter.threshold = float(spotter.leave_one_out().max() * args.margin)
+        spotter.save(args.out)
+        print(f"Saved {len(spotter.templates)} templates to {args.out} (threshold={spotter.threshold:.3f})")
+    else:
+        spotter = KeywordSpotter.load(args.templates)
+        negatives = _load_wavs(sorted(glob.glob(os.path.join(args.negatives, "*.wav"))))
+        spotter.threshold, frr = calibrate(spotter, negatives, far_per_hour=args.far)
+        spotter.save(args.templates)
+        print(f"threshold={spotter.threshold:.3f}  expected false rejects={frr:.0%}")
+
+
+if __name__ == "__main__":
+    main()
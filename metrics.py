@@ -0,0 +1,283 @@
+# metrics.py
+# Per-stage latency and throughput of the voice pipeline.
+#
+#   metrics = Metrics(sample_rate=16000)
+#   metrics.serve(9464)                  # Prometheus text at http://127.0.0.1:9464/metrics
+#   metrics.trace_to("trace.jsonl")      # optional: one JSON line per utterance
+#
+#   metrics.tick(position)               # audio thread: current sample clock
+#   with metrics.timer("vad"):           # stage duration -> p50/p95/p99
+#       vad.process(chunk)
+#   metrics.decode("wake", seconds, audio_seconds)   # duration, real-time factor, decodes/s
+#   metrics.collect(lambda: capture.stats(), prefix="capture")   # pulled at scrape time
+#
+# An Utterance follows one wake -> command cycle. Its marks are positions on
+# the sample clock (RingBuffer.total), so "speech ended at 51200, end decided
+# at 56000, command executed at 58400" lines up with the audio itself; the
+# differences are observed as the endpoint and end-to-end latencies.
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW = 1024           # observations kept per summary
+RATE_WINDOW = 10.0      # seconds over which per-second rates are computed
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Utterance:
+    """Sample-clock marks and stage durations of one wake -> command cycle."""
+
+    def __init__(self, metrics, uid, position):
+        self.metrics = metrics
+        self.id = uid
+        self.marks = {"wake_start": position}
+        self.durations = {}
+        self.fields = {}
+        self.finished = False
+
+    def mark(self, stage, position=None):
+        self.marks[stage] = self.metrics.position if position is None else position
+
+    def add(self, stage, seconds, observe=True):
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+        if observe:
+            self.metrics.observe(stage, seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - t0)
+
+    def finish(self, **fields):
+        if self.finished:
+            return
+        self.finished = True
+        self.mark("done")
+        self.fields.update(fields)
+        self.metrics._finish(self)
+
+    def to_dict(self):
+        return {"id": self.id, "sample_rate": self.metrics.sample_rate, "marks": self.marks,
+                "durations": {k: round(v, 4) for k, v in self.durations.items()}, **self.fields}
+
+
+class Metrics:
+    def __init__(self, sample_rate=16000, prefix="voice"):
+        self.sample_rate = sample_rate
+        self.prefix = prefix
+        self.position = 0               # latest sample clock seen by tick()
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.summaries = defaultdict(lambda: deque(maxlen=WINDOW))
+        self.sums = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.counters = defaultdict(float)
+        self.events = defaultdict(lambda: deque(maxlen=10000))   # timestamps, for rates
+        self.gauges = {}
+        self.collectors = []
+        self.next_id = 0
+        self.trace = None
+        self.server = None
+
+    # ---- recording ----
+    def tick(self, position):
+        self.position = position
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _labels(labels))
+        with self.lock:
+            self.summaries[key].append(seconds)
+            self.sums[key] += seconds
+            self.counts[key] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def inc(self, name, n=1, **labels):
+        key = (name, _labels(labels))
+        with self.lock:
+            self.counters[key] += n
+            self.events[key].append(time.monotonic())
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, _labels(labels))] = value
+
+    def decode(self, kind, seconds, audio_seconds, utterance=None):
+        """One model decode: duration, real-time factor and count."""
+        self.observe("decode", seconds, kind=kind)
+        if audio_seconds > 0:
+            self.observe("rtf", seconds / audio_seconds, kind=kind)
+        self.inc("decodes", kind=kind)
+        if utterance is not None:
+            utterance.add(f"{kind}_decode", seconds, observe=False)
+
+    def collect(self, fn, prefix=""):
+        # fn() -> {name: number}; exported as gauges at every scrape
+        self.collectors.append((prefix, fn))
+
+    def utterance(self, position):
+        with self.lock:
+            self.next_id += 1
+            uid = self.next_id
+        return Utterance(self, uid, position)
+
+    def _finish(self, utt):
+        marks = utt.marks
+        if "wake_end" in marks and "wake_detected" in marks:
+            self.observe("wake", (marks["wake_detected"] - marks["wake_end"]) / self.sample_rate)
+        if "speech_end" in marks and "endpoint" in marks:
+            self.observe("endpoint", (marks["endpoint"] - marks["speech_end"]) / self.sample_rate)
+        if "speech_end" in marks:
+            # audio time from the end of speech to the end of the cycle (decode, match, execute)
+            self.observe("end_to_end", (marks["done"] - marks["speech_end"]) / self.sample_rate)
+        self.inc("utterances", outcome=utt.fields.get("outcome", "done"))
+        if self.trace is not None:
+            line = json.dumps(utt.to_dict())
+            with self.lock:
+                self.trace.write(line + "\n")
+                self.trace.flush()
+
+    # ---- reading ----
+    def rate(self, key, now=None):
+        now = now or time.monotonic()
+        with self.lock:
+            events = list(self.events[key])
+        return sum(1 for t in events if now - t <= RATE_WINDOW) / RATE_WINDOW
+
+    def _pulled(self):
+        values = {}
+        for prefix, fn in self.collectors:
+            try:
+                stats = fn()
+            except Exception:
+                continue
+            for name, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    values[f"{prefix}_{name}" if prefix else name] = value
+        return values
+
+    def snapshot(self):
+        """Percentiles, counters and rates as a dict (for logs and stats())."""
+        with self.lock:
+            summaries = {k: np.array(v) for k, v in self.summaries.items() if v}
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        out = {}
+        for (name, labels), values in summaries.items():
+            key = name + "".join(f"[{v}]" for _, v in labels)
+            out[key] = {f"p{int(q * 100)}": round(float(np.quantile(values, q)), 4) for q in QUANTILES}
+            out[key]["count"] = self.counts[(name, labels)]
+        for (name, labels), value in counters.items():
+            key = name + "".join(f"[{v}]" for _, v in labels)
+            out[key + "_total"] = value
+            out[key + "_per_second"] = round(self.rate((name, labels)), 2)
+        out.update({name + "".join(f"[{v}]" for _, v in labels): value
+                    for (name, labels), value in gauges.items()})
+        out.update(self._pulled())
+        return out
+
+    def render(self):
+        """Prometheus text exposition format."""
+        p = self.prefix
+        lines = []
+        with self.lock:
+            summaries = {k: np.array(v) for k, v in self.summaries.items() if v}
+            sums, counts = dict(self.sums), dict(self.counts)
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        seen = set()
+        for (name, labels), values in sorted(summaries.items()):
+            metric = f"{p}_{name}_seconds" if name != "rtf" else f"{p}_real_time_factor"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} summary")
+            for q in QUANTILES:
+                lines.append(f"{metric}{_format_labels(labels, quantile=q)} {np.quantile(values, q):.6f}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {sums[(name, labels)]:.6f}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {counts[(name, labels)]}")
+        # every family's samples are contiguous: all the _total samples of a counter,
+        # then its _per_second gauge
+        families = defaultdict(list)
+        for (name, labels), value in sorted(counters.items()):
+            families[name].append((labels, value))
+        for name, samples in families.items():
+            metric = f"{p}_{name}_total"
+            seen.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f"{metric}{_format_labels(labels)} {value:g}" for labels, value in samples)
+            rate_metric = f"{p}_{name}_per_second"
+            seen.add(rate_metric)
+            lines.append(f"# TYPE {rate_metric} gauge")
+            lines.extend(f"{rate_metric}{_format_labels(labels)} {self.rate((name, labels)):.3f}"
+                         for labels, _ in samples)
+        gauges = {(f"{p}_{name}", labels): value for (name, labels), value in gauges.items()}
+        gauges.update({(f"{p}_{name}", ()): value for name, value in self._pulled().items()})
+        gauges[(f"{p}_sample_clock", ())] = self.position
+        gauges[(f"{p}_uptime_seconds", ())] = round(time.time() - self.started, 3)
+        for (metric, labels), value in sorted(gauges.items()):
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    # ---- export ----
+    def serve(self, port=9464, host="127.0.0.1"):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass        # no line per scrape
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True).start()
+        print(f"Metrics on http://{host}:{self.server.server_port}/metrics")
+        return self
+
+    def trace_to(self, path):
+        self.trace = open(path, "a", encoding="utf-8")
+        return self
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server = None
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
@@ -1,10 +1,27 @@
-import sounddevice as sd
+import sys
+from device_probe import load_devices, find_input
 
-print(sd.query_devices(5))       # or the index of your mic
-print("\nSupported samplerates:")
-for rate in [8000,16000,22050,32000,44100,48000]:
-    try:
-        sd.check_input_settings(device=5, samplerate=rate)
-        print(f"✅ {rate} Hz works")
-    except Exception as e:
-        print(f"❌ {rate} Hz not supported:", e)
+# python mic_specs.py 5   (index or part of the name; no argument = every input)
+# the probe runs once and is cached in audio_devices.json, --refresh probes again
+refresh = "--refresh" in sys.argv
+args = [a for a in sys.argv[1:] if a != "--refresh"]
+inputs = load_devices(refresh=refresh)
+
+if args:
+    device = int(args[0]) if args[0].isdigit() else args[0]
+    selected = [find_input(inputs, device)]
+    if selected[0] is None:
+        sys.exit(f"No input device {args[0]!r}")
+else:
+    selected = sorted(inputs.values(), key=lambda d: d.get("index", -1))
+
+for info in selected:
+    print(f"{info.get('index', '-')}: {info['name']} ({info['hostapi']}), {info['channels']} channel(s), "
+          f"default {info['default_rate']} Hz, latency {info['low_latency'] * 1000:.1f} ms")
+    print("Supported samplerates:")
+    for rate in [8000, 16000, 22050, 32000, 44100, 48000]:
+        if rate in info["rates"]:
+            print(f"✅ {rate} Hz works")
+        else:
+            print(f"❌ {rate} Hz not supported")
+    print()
@@ -1,22 +1,24 @@
 import sounddevice as sd
 import numpy as np
-import scipy.io.wavfile as wav
-from scipy.signal import resample
+from device_probe import input_settings
+from resampler import resample
+from wav_io import write_wav
 
 duration = 3
-sample_rate = 16000  # native for ALC287
-device_index = 8    # your analog mic
+# best input and a rate it supports natively (probed once, cached in audio_devices.json);
+# pass an index instead of "auto" to test a specific mic
+device_index, sample_rate = input_settings("auto")
 
-print("🎙️ Using device:", sd.query_devices(device_index)['name'])
+print("🎙️ Using device:", sd.query_devices(device_index, "input")['name'], f"({sample_rate} Hz)")
 print("🎙️ Speak now...")
 
 audio = sd.rec(int(duration * sample_rate), samplerate=sample_rate,
                channels=1, dtype='float32', device=device_index)
 sd.wait()
 
-# 🔁 Resample to 16kHz for Whisper
+# 🔁 Resample to 16kHz for Whisper (the same polyphase filter the live capture uses)
 target_rate = 16000
-resampled = resample(audio, int(len(audio) * target_rate / sample_rate))
+resampled = resample(audio[:, 0], sample_rate, target_rate)
 
-wav.write("test_mic.wav", target_rate, (resampled * 32767).astype(np.int16))
+write_wav("test_mic.wav", resampled, target_rate)
 print("✅ Saved as test_mic.wav (resampled to 16 kHz)")
@@ -0,0 +1,60 @@
+# model_profile.py
+# Model settings shared by all entry points, tuned per host by autotune.py.
+#
+# model_profile.json (written by `python autotune.py run clips/`) holds the
+# fastest setting that met the accuracy and real-time targets on this
+# machine. Without the file every script keeps its own defaults.
+#
+#   profile = load_profile(model="tiny.en", device="cpu", compute_type="int8")
+#   model = WhisperModel(**model_kwargs(profile))
+#   model.transcribe(audio, beam_size=profile["beam_size"])         # final decodes
+#   model.transcribe(audio, beam_size=profile["fast_beam_size"])    # wake checks, partials
+import json
+import os
+
+PROFILE_FILE = os.environ.get("WHISPER_PROFILE", "model_profile.json")
+
+DEFAULTS = {
+    "model": "tiny.en",
+    "device": "cpu",
+    "compute_type": "int8",
+    "cpu_threads": 0,           # 0 = CTranslate2 default
+    "beam_size": 1,             # greedy, as the scripts decoded before profiles existed
+    "fast_beam_size": 1,
+}
+
+
+def load_profile(path=None, verbose=True, **defaults):
+    """Settings from the profile file, falling back to `defaults`, then DEFAULTS."""
+    path = path or PROFILE_FILE
+    profile = dict(DEFAULTS, **defaults)
+    try:
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+    except FileNotFoundError:
+        saved = None
+    except (OSError, ValueError) as e:
+        print(f"Ignoring model profile {path}: {e}")
+        saved = None
+    if saved:
+        profile.update({k: saved[k] for k in DEFAULTS if k in saved})
+    if verbose:
+        source = path if saved else "defaults"
+        print(f"Model profile ({source}): {profile['model']} {profile['device']}/{profile['compute_type']}, "
+              f"{profile['cpu_threads'] or 'default'} threads, beam {profile['beam_size'] or 'greedy'}/{profile['fast_beam_size']}")
+    return profile
+
+
+def model_kwargs(profile):
+    # keyword arguments for faster_whisper.WhisperModel
+    return {
+        "model_size_or_path": profile["model"],
+        "device": profile["device"],
+        "compute_type": profile["compute_type"],
+        "cpu_threads": profile["cpu_threads"],
+    }
+
+
+def save_profile(profile, path=None):
+    with open(path or PROFILE_FILE, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
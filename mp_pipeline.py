@@ -0,0 +1,455 @@
+# mp_pipeline.py
+# Voice assistant split over processes, so decoding never competes with the
+# audio callback for the GIL.
+#
+#   capture process   PortAudio callback -> SharedRingBuffer (one copy per block)
+#   control process   VAD, wake gating, endpointing, command matching (this one)
+#   decode workers    Whisper on zero-copy views of the shared ring
+#
+# Jobs and results are small dicts on multiprocessing queues; the audio itself
+# never goes through a queue, only sample-clock positions do. Every worker has
+# its own job queue and gets one job at a time, so the control process knows
+# what each worker is doing: commands go before wake checks, only the newest
+# waiting wake check is kept, and a worker that dies is restarted with a fresh
+# queue (its command job is retried once). A dead capture process is restarted
+# and keeps writing at the same sample clock.
+#
+#   python mp_pipeline.py --workers 2
+#   python mp_pipeline.py --wav test.wav      (file instead of the microphone)
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import engine
+from actions import execute, play_beep
+from command_matcher import CommandIndex
+from ring_buffer import SharedRingBuffer
+from vad import FrameVAD, trim_silence
+from endpointer import Endpointer
+from metrics import Metrics
+from model_profile import load_profile, model_kwargs as profile_kwargs
+
+WAKE_WORD = "garmin"
+SAMPLE_RATE = 16000
+BLOCK_DURATION = 0.03
+RING_SECONDS = 30.0         # must hold a whole command plus the wake window and the decode lag
+WAKE_WINDOW = 3.0
+WAKE_HOP = 0.5
+PAUSE_THRESHOLD = 0.8
+WAKE_WORD_DELAY = 1.5
+MAX_COMMAND_DURATION = 15.0
+MODEL = dict(model_size_or_path="tiny.en", device="cpu", compute_type="int8", cpu_threads=2)
+BEAM_SIZE = 5           # commands
+FAST_BEAM_SIZE = 1      # wake checks
+WARMUP = True           # workers decode silence before reporting ready
+
+
+# ================================
+# CAPTURE PROCESS
+# ================================
+def _capture_main(ring_name, capacity, sample_rate, blocksize, device, wav, stats, stop):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)     # the control process decides when to stop
+    ring = SharedRingBuffer.attach(ring_name, capacity)
+    try:
+        if wav:
+            _feed_wav(ring, wav, sample_rate, blocksize, stats, stop)
+            return
+        import sounddevice as sd
+        from device_probe import input_settings
+        from resampler import Resampler
+
+        # a rate the device supports natively (cached probe), converted to sample_rate in the callback
+        device, rate = input_settings(device, sample_rate)
+        resampler = None
+        if rate != sample_rate:
+            blocksize = round(blocksize * rate / sample_rate)
+            resampler = Resampler(rate, sample_rate, max_block=blocksize)
+
+        def callback(indata, frames, time_info, status):
+            stats[0] += 1
+            if status.input_overflow:
+                stats[1] += 1
+            if resampler is None:
+                ring.write(indata[:, 0])
+            else:
+                ring.write(resampler.out[:resampler.process(indata[:, 0])])
+
+        with sd.InputStream(samplerate=rate, channels=1, dtype="float32",
+                            blocksize=blocksize, device=device, callback=callback):
+            stop.wait()
+    finally:
+        ring.close()
+
+
+def _feed_wav(ring, path, sample_rate, blocksize, stats, stop):
+    # real-time playback of a file into the ring, followed by silence
+    from resampler import resample
+    from wav_io import read_wav
+    audio, rate = read_wav(path)
+    audio = resample(audio, rate, sample_rate)
+    silence = np.zeros(blocksize, dtype=np.float32)
+    start = time.monotonic()
+    for i in range(0, 1 << 62, blocksize):
+        if stop.is_set():
+            return
+        block = audio[i:i + blocksize] if i < len(audio) else silence
+        ring.write(block)
+        stats[0] += 1
+        delay = start + (i + blocksize) / sample_rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+# ================================
+# DECODE WORKERS
+# ================================
+def _worker_main(worker_id, ring_name, capacity, model_kwargs, warmup, jobs, results, stop):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from keyword_spotter import wake_word_end
+    ring = SharedRingBuffer.attach(ring_name, capacity)
+    model = engine.load_model(warmup=warmup, **model_kwargs)    # a restarted worker is warm before its retry
+    results.put({"type": "ready", "worker": worker_id,
+                 "seconds": model.load_seconds + (model.warmup_seconds or 0.0)})
+    try:
+        while not stop.is_set():
+            try:
+                job = jobs.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if job is None:
+                break
+            results.put(_decode(model, ring, job, worker_id, wake_word_end))
+    finally:
+        ring.close()
+
+
+def _decode(model, ring, job, worker_id, wake_word_end):
+    t0 = time.perf_counter()
+    start = max(job["start"], ring.oldest)
+    result = {"type": "result", "id": job["id"], "kind": job["kind"], "worker": worker_id,
+              "start": start, "end": job["end"], "text": "", "wake_end": None, "error": None}
+    try:
+        audio = ring.view(start, job["end"])        # zero-copy unless the range wraps
+        if job["kind"] == "command":
+            audio = trim_silence(audio, job["noise_floor_db"], SAMPLE_RATE)
+        segments, _ = model.transcribe(audio, language="en", beam_size=job["beam_size"],
+                                       word_timestamps=job["kind"] == "wake", temperature=0.0)
+        segments = list(segments)       # decode while the view is still valid
+        result["text"] = " ".join(s.text for s in segments).strip()
+        if job["kind"] == "wake":
+            end = wake_word_end(segments, job["wake_word"])
+            if end is not None:
+                result["wake_end"] = start + int(end * SAMPLE_RATE)
+        result["overwritten"] = not ring.valid(start)
+    except Exception as e:
+        result["error"] = repr(e)
+    result["seconds"] = time.perf_counter() - t0
+    return result
+
+
+# ================================
+# CONTROL PROCESS
+# ================================
+class Pipeline:
+    def __init__(self, workers=1, device=None, wav=None, model_kwargs=MODEL,
+                 commands="commands.csv", beam_size=BEAM_SIZE, fast_beam_size=FAST_BEAM_SIZE, warmup=WARMUP):
+        self.n_workers = workers
+        self.device = device
+        self.wav = wav
+        self.model_kwargs = dict(model_kwargs)
+        self.beam_size = beam_size
+        self.fast_beam_size = fast_beam_size
+        self.warmup = warmup
+        self.blocksize = int(BLOCK_DURATION * SAMPLE_RATE)
+        self.capacity = int(RING_SECONDS * SAMPLE_RATE)
+        self.ctx = mp.get_context("spawn")      # no fork: workers may use CUDA
+        self.command_index = CommandIndex(commands)
+        self.vad = FrameVAD(sample_rate=SAMPLE_RATE)
+        self.endpointer = Endpointer(SAMPLE_RATE, silence=PAUSE_THRESHOLD, no_speech=WAKE_WORD_DELAY,
+                                     max_length=MAX_COMMAND_DURATION)
+
+        self.ring = None
+        self.capture = None
+        self.workers = [None] * workers
+        self.queues = [None] * workers
+        self.busy = [None] * workers    # job each worker is decoding
+        self.ready = set()
+        self.commands = deque()         # command jobs waiting for a worker
+        self.wake = None                # newest wake check waiting for a worker
+        self.next_id = 0
+        self.position = 0               # samples consumed by the control loop
+        self.recording = False
+        self.next_wake_check = 0
+        self.listen_from = 0
+        self.listening = False
+        self.model_ready = 0.0          # slowest worker's model load + warm-up
+        self.metrics = Metrics(SAMPLE_RATE)
+        self.utterance = None           # metrics.Utterance from wake word to end of speech
+        self.utterances = {}            # command job id -> its Utterance
+        # statistics
+        self.restarts = {"capture": 0, "worker": 0}
+        self.decode_seconds = {"wake": 0.0, "command": 0.0}
+        self.decodes = {"wake": 0, "command": 0}
+        self.dropped_wake = 0
+
+    # ---- processes ----
+    def start(self):
+        self.ring = SharedRingBuffer.create(self.capacity)
+        self.results = self.ctx.Queue()
+        self.stop_event = self.ctx.Event()
+        self.capture_stats = self.ctx.Array("q", 2, lock=False)    # callbacks, overflows
+        self._start_capture()
+        for i in range(self.n_workers):
+            self._start_worker(i)
+        return self
+
+    def _start_capture(self):
+        self.capture = self.ctx.Process(
+            target=_capture_main, name="capture", daemon=True,
+            args=(self.ring.name, self.capacity, SAMPLE_RATE, self.blocksize, self.device,
+                  self.wav, self.capture_stats, self.stop_event))
+        self.capture.start()
+
+    def _start_worker(self, i):
+        # a fresh queue: a killed worker may have left the old one locked
+        self.queues[i] = self.ctx.Queue()
+        self.workers[i] = self.ctx.Process(
+            target=_worker_main, name=f"decode-{i}", daemon=True,
+            args=(i, self.ring.name, self.capacity, self.model_kwargs, self.warmup, self.queues[i],
+                  self.results, self.stop_event))
+        self.workers[i].start()
+
+    def _check_processes(self):
+        if not self.capture.is_alive():
+            print(f"Capture process exited with code {self.capture.exitcode}, restarting")
+            self.restarts["capture"] += 1
+            self._start_capture()
+        for i, proc in enumerate(self.workers):
+            if proc.is_alive():
+                continue
+            print(f"Decode worker {i} exited with code {proc.exitcode}, restarting")
+            self.restarts["worker"] += 1
+            self.ready.discard(i)
+            job, self.busy[i] = self.busy[i], None
+            if job is not None and job["kind"] == "command" and not job.get("retry"):
+                self.commands.appendleft(dict(job, retry=True))
+            self.queues[i].close()
+            self._start_worker(i)
+
+    def shutdown(self, timeout=5.0):
+        previous = signal.signal(signal.SIGINT, signal.SIG_IGN)    # a second Ctrl-C must not skip the cleanup
+        try:
+            self.stop_event.set()
+            for q in self.queues:
+                q.put(None)
+            for proc in [self.capture] + self.workers:
+                proc.join(timeout)
+                if proc.is_alive():
+                    proc.terminate()
+                    proc.join(1.0)
+            for q in self.queues + [self.results]:
+                q.close()
+        finally:
+            self.ring.close()
+            signal.signal(signal.SIGINT, previous)
+
+    # ---- jobs ----
+    def _submit(self, job):
+        job["id"] = self.next_id
+        job["submitted"] = time.perf_counter()
+        self.next_id += 1
+        if job["kind"] == "command":
+            self.commands.append(job)
+        else:
+            if self.wake is not None:
+                self.dropped_wake += 1      # a newer window replaces it
+            self.wake = job
+        self._dispatch()
+        return job["id"]
+
+    def _dispatch(self):
+        for i in sorted(self.ready):
+            if self.busy[i] is not None:
+                continue
+            if self.commands:
+                job = self.commands.popleft()
+            elif self.wake is not None:
+                job, self.wake = self.wake, None
+            else:
+                return
+            self.busy[i] = job
+            self.metrics.observe("queue_wait", time.perf_counter() - job["submitted"], kind=job["kind"])
+            self.queues[i].put(job)
+        self.metrics.set("queue_depth", len(self.commands) + (self.wake is not None))
+
+    def _poll_results(self):
+        while True:
+            try:
+                msg = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if msg["type"] == "ready":
+                self.ready.add(msg["worker"])
+                self.model_ready = max(self.model_ready, msg["seconds"])
+                if len(self.ready) == self.n_workers and not self.listening:
+                    self.listening = True
+                    print(f"Listening ({self.n_workers} decode worker(s), startup {engine.startup_seconds():.2f} s, "
+                          f"model load + warm-up {self.model_ready:.2f} s). Say {WAKE_WORD}...")
+            else:
+                self.busy[msg["worker"]] = None
+                self._on_result(msg)
+        self._dispatch()
+
+    def _on_result(self, result):
+        self.decodes[result["kind"]] += 1
+        self.decode_seconds[result["kind"]] += result["seconds"]
+        utt = self.utterances.pop(result["id"], None)
+        self.metrics.decode(result["kind"], result["seconds"], (result["end"] - result["start"]) / SAMPLE_RATE, utt)
+        if result["error"]:
+            print(f"{result['kind'].capitalize()} decode error:", result["error"])
+        if result["kind"] == "wake":
+            wake_end = result["wake_end"]
+            if wake_end is not None and wake_end >= self.listen_from and not self.recording:
+                # the command starts right after the wake word, even if the result came late
+                self.recording = True
+                self.endpointer.start(wake_end)
+                self.utterance = self.metrics.utterance(result["start"])
+                self.utterance.mark("wake_end", wake_end)
+                self.utterance.mark("wake_detected", self.position)
+                print(f"[WAKE WORD DETECTED: {WAKE_WORD.upper()}]")
+                threading.Thread(target=play_beep, args=(SAMPLE_RATE,), daemon=True).start()
+            return
+
+        utt = utt or self.metrics.utterance(result["start"])
+        if result.get("overwritten"):
+            print("Command audio was overwritten before it was decoded, increase RING_SECONDS")
+        text = result["text"].lower()
+        if not text:
+            print("Command empty")
+            utt.finish(outcome="error" if result["error"] else "empty")
+            return
+        print(f"Command: {text}")
+        with utt.timer("match"):
+            match = self.command_index.best(text)
+        if match is None:
+            print("No matching command found.")
+            utt.finish(outcome="no_match", text=text)
+            return
+        print(f"[MATCH] {match[0]} (score={match[1]:.1f})")
+        with utt.timer("execute"):
+            execute(match[0])
+        utt.finish(outcome="executed", text=text, command=match[0], score=round(match[1], 1))
+
+    # ---- audio ----
+    def _on_audio(self, chunk, position):
+        self.metrics.tick(position)
+        with self.metrics.timer("vad"):
+            self.vad.process(chunk)
+        if self.recording:
+            eou = self.endpointer.update(position, self.vad.last_speech_sample)
+            if eou is None:
+                return
+            self.recording = False
+            self.listen_from = position
+            self.wake = None
+            utt, self.utterance = self.utterance, None
+            utt.mark("speech_end", eou.end)
+            utt.mark("endpoint", eou.detected)
+            if eou.reason != "no_speech":
+                job_id = self._submit({"kind": "command", "start": eou.start, "end": eou.detected,
+                                       "beam_size": self.beam_size, "noise_floor_db": self.vad.noise_floor_db})
+                self.utterances[job_id] = utt
+            else:
+                utt.finish(outcome="no_speech")
+            return
+
+        window_start = max(position - int(WAKE_WINDOW * SAMPLE_RATE), self.listen_from)
+        if (position >= self.next_wake_check and position - window_start >= SAMPLE_RATE
+                and self.vad.speech_since(window_start)):
+            self.next_wake_check = position + int(WAKE_HOP * SAMPLE_RATE)
+            self._submit({"kind": "wake", "start": window_start, "end": position,
+                          "beam_size": self.fast_beam_size, "wake_word": WAKE_WORD})
+
+    def run(self):
+        poll = self.blocksize / SAMPLE_RATE / 2
+        last_check = time.monotonic()
+        while True:
+            total = self.ring.total
+            if total > self.position:
+                chunk = self.ring.view(max(self.position, self.ring.oldest), total)
+                # audio waiting in the ring: how far the control loop lags behind capture
+                self.metrics.observe("capture", (total - self.position) / SAMPLE_RATE)
+                self.position = total
+                self._on_audio(chunk, total)
+            self._poll_results()
+            now = time.monotonic()
+            if now - last_check > 0.5:
+                last_check = now
+                self._check_processes()
+            if self.ring.total == self.position:
+                time.sleep(poll)
+
+    def stats(self):
+        return {
+            "callbacks": self.capture_stats[0],
+            "overflows": self.capture_stats[1],
+            "restarts": dict(self.restarts),
+            "decodes": dict(self.decodes),
+            "decode_seconds": {k: round(v, 3) for k, v in self.decode_seconds.items()},
+            "dropped_wake": self.dropped_wake,
+            "samples": self.position,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process voice assistant")
+    parser.add_argument("--workers", type=int, default=1, help="decode worker processes")
+    parser.add_argument("--device", type=int, default=None, help="input device index")
+    parser.add_argument("--wav", help="read audio from a 16 kHz WAV file instead of the microphone")
+    parser.add_argument("--model", help="overrides model_profile.json")
+    parser.add_argument("--compute-type")
+    parser.add_argument("--cpu-threads", type=int)
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port")
+    parser.add_argument("--trace", help="append one JSON line per utterance to this file")
+    args = parser.parse_args()
+
+    # loaded here, not at import: spawned workers re-import this module
+    profile = load_profile(model=MODEL["model_size_or_path"], device=MODEL["device"],
+                           compute_type=MODEL["compute_type"], cpu_threads=MODEL["cpu_threads"],
+                           beam_size=BEAM_SIZE, fast_beam_size=FAST_BEAM_SIZE)
+    for key in ("model", "compute_type", "cpu_threads"):
+        if getattr(args, key) is not None:
+            profile[key] = getattr(args, key)
+    pipeline = Pipeline(workers=args.workers, device=args.device, wav=args.wav,
+                        model_kwargs=profile_kwargs(profile), beam_size=profile["beam_size"],
+                        fast_beam_size=profile["fast_beam_size"])
+    pipeline.metrics.collect(pipeline.stats)
+    if args.metrics_port is not None:
+        pipeline.metrics.serve(args.metrics_port)
+    if args.trace:
+        pipeline.metrics.trace_to(args.trace)
+    print(f"Starting capture and {args.workers} decode worker(s) (pid {os.getpid()})...")
+    # SIGTERM (service stop) shuts down as cleanly as Ctrl-C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    pipeline.start()
+    try:
+        pipeline.run()
+    except KeyboardInterrupt:
+        print("\nExiting..")
+    finally:
+        pipeline.shutdown()
+        print("Pipeline:", pipeline.stats())
+        print("Metrics:", pipeline.metrics.snapshot())
+        pipeline.metrics.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+# replay.py
+# Offline end-to-end replay: feeds WAV files through an entry script's own
+# audio_callback instead of a microphone, and writes a JSON latency report.
+#
+#   python replay.py run main_1.0.py recordings/ --speed 1 --out run.json
+#   python replay.py compare base.json run.json
+#
+# Every WAV file is one utterance (e.g. "garmin ... open chrome"), played with
+# `--gap` seconds of silence after it so endpointing can finish. An optional
+# <name>.txt next to a WAV holds the reference transcript.
+#
+# sounddevice.InputStream is replaced by FakeInputStream before the script is
+# run, so the script is used unmodified. Printed lines are timestamped with the
+# stream position at which they appeared; from those the report derives
+# per-utterance wake-detection time, end-of-speech-to-command latency and the
+# transcripts. Real-time factor is process CPU time per second of audio.
+import _thread
+import argparse
+import glob
+import json
+import os
+import runpy
+import sys
+import tempfile
+import threading
+import time
+import types
+from types import SimpleNamespace
+
+import numpy as np
+
+from vad import FrameVAD
+from wav_io import read_wav
+
+SAMPLE_RATE = 16000
+
+
+# ================================
+# FAKE AUDIO DEVICE
+# ================================
+class Playlist:
+    """The audio a FakeInputStream plays, with the wall time each block was fed."""
+
+    def __init__(self, utterances, sample_rate=SAMPLE_RATE, speed=1.0, gap=3.0, lead=1.0):
+        self.sample_rate = sample_rate
+        self.speed = speed          # 1 = real time, 4 = four times faster, 0 = no pacing
+        self.utterances = []        # dicts with start/speech_start/speech_end positions
+        parts = [np.zeros(int(lead * sample_rate), dtype=np.float32)]
+        position = len(parts[0])
+        for path, audio in utterances:
+            vad = FrameVAD(sample_rate=sample_rate)
+            flags = vad.process(audio)
+            speech = np.flatnonzero(flags)
+            speech_start = speech[0] * vad.frame_len if len(speech) else 0
+            self.utterances.append({
+                "file": os.path.basename(path),
+                "start": position,
+                "speech_start": position + speech_start,
+                "speech_end": position + min(vad.last_speech_sample, len(audio)),
+                "end": position + len(audio),
+            })
+            silence = np.zeros(int(gap * sample_rate), dtype=np.float32)
+            parts += [audio, silence]
+            position += len(audio) + len(silence)
+        self.audio = np.concatenate(parts)
+        self.position = 0
+        self.feed_log = []          # (position after the block, wall time)
+        self.done = threading.Event()
+
+    def wall_time_of(self, position):
+        # wall time at which a sample position was handed to the callback
+        if not self.feed_log:
+            return None
+        positions, times = zip(*self.feed_log)
+        i = int(np.searchsorted(positions, position))
+        return times[min(i, len(times) - 1)]
+
+
+class FakeInputStream:
+    """Stand-in for sounddevice.InputStream that plays the current Playlist."""
+
+    playlist = None
+
+    def __init__(self, samplerate=SAMPLE_RATE, channels=1, dtype="float32", callback=None,
+                 blocksize=None, device=None, **kwargs):
+        if samplerate != self.playlist.sample_rate:
+            raise ValueError(f"replay audio is {self.playlist.sample_rate} Hz, stream wants {samplerate} Hz")
+        self.samplerate = samplerate
+        self.channels = channels
+        self.dtype = dtype
+        self.callback = callback
+        self.blocksize = blocksize or 1024
+        self.active = False
+        self.thread = None
+
+    def start(self):
+        self.active = True
+        self.thread = threading.Thread(target=self._play, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.active = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(1.0)
+
+    close = stop
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _play(self):
+        playlist = self.playlist
+        audio, n = playlist.audio, self.blocksize
+        t0 = time.time()
+        while self.active and playlist.position < len(audio):
+            block = audio[playlist.position:playlist.position + n]
+            if len(block) < n:
+                block = np.pad(block, (0, n - len(block)))
+            indata = np.repeat(block[:, None], self.channels, axis=1).astype(self.dtype)
+            now = time.time()
+            self.callback(indata, n, SimpleNamespace(inputBufferAdcTime=now, currentTime=now), _NoStatus())
+            playlist.position += n
+            playlist.feed_log.append((playlist.position, time.time()))
+            if playlist.speed > 0:
+                # pace against the start so the feed doesn't drift
+                delay = t0 + playlist.position / playlist.sample_rate / playlist.speed - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+        playlist.done.set()
+
+
+class _NoStatus:
+    input_overflow = False
+
+    def __bool__(self):
+        return False
+
+
+def install_fake_device(playlist):
+    """Points sounddevice.InputStream at FakeInputStream, which is then the only
+    input device (at the replay rate); play()/wait() become no-ops."""
+    try:
+        import sounddevice as sd
+    except (ImportError, OSError):
+        # no PortAudio on this machine: the scripts only need these names
+        sd = types.ModuleType("sounddevice")
+        sys.modules["sounddevice"] = sd
+    FakeInputStream.playlist = playlist
+    device = {"name": "replay", "hostapi": 0, "max_input_channels": 1, "max_output_channels": 0,
+              "default_samplerate": float(playlist.sample_rate),
+              "default_low_input_latency": 0.0, "default_high_input_latency": 0.0}
+
+    def check_input_settings(device=None, samplerate=None, **kwargs):
+        if samplerate is not None and samplerate != playlist.sample_rate:
+            raise ValueError(f"replay audio is {playlist.sample_rate} Hz")
+
+    sd.InputStream = FakeInputStream
+    sd.query_devices = lambda index=None, kind=None: device if kind or index is not None else [device]
+    sd.query_hostapis = lambda *a, **k: [{"name": "replay"}]
+    sd.check_input_settings = check_input_settings
+    sd.play = lambda *a, **k: None
+    sd.wait = lambda *a, **k: None
+    # the fake device list must not replace the cached probe of the real one
+    import device_probe
+    device_probe.CACHE_FILE = os.path.join(tempfile.gettempdir(), "replay_audio_devices.json")
+    return sd
+
+
+# ================================
+# OUTPUT CAPTURE
+# ================================
+class EventLog:
+    """stdout replacement that records every printed line with its wall time
+    and the stream position at that moment."""
+
+    def __init__(self, playlist, stream):
+        self.playlist = playlist
+        self.stream = stream
+        self.lines = []
+        self.partial = ""
+        self.lock = threading.Lock()
+        self.last_output = time.time()
+
+    def write(self, text):
+        self.stream.write(text)
+        with self.lock:
+            self.partial += text
+            while "\n" in self.partial:
+                line, self.partial = self.partial.split("\n", 1)
+                line = line.split("\r")[-1].strip()
+                if line:
+                    self.lines.append((time.time(), self.playlist.position, line))
+                    self.last_output = time.time()
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def _stop_when_done(playlist, log, settle, timeout):
+    # after the last block, wait until the script stops printing, then Ctrl+C it
+    playlist.done.wait()
+    end = time.time() + timeout
+    while time.time() < end and time.time() - log.last_output < settle:
+        time.sleep(0.05)
+    _thread.interrupt_main()
+
+
+# ================================
+# REPORT
+# ================================
+def _percentile(values, q):
+    return round(float(np.percentile(values, q)), 3) if values else None
+
+
+def build_report(script, playlist, log, references, wall_seconds, cpu_seconds):
+    utterances = []
+    for u in playlist.utterances:
+        utterances.append(dict(u, lines=[], wake_time=None, command_time=None,
+                               transcript=None, command=None, reference=references.get(u["file"])))
+
+    for wall, position, line in log.lines:
+        # attribute each line to the last utterance that had started playing
+        owner = None
+        for u in utterances:
+            if u["start"] <= position:
+                owner = u
+        if owner is None:
+            continue
+        owner["lines"].append(line)
+        if line.startswith("[WAKE WORD DETECTED") and owner["wake_time"] is None:
+            owner["wake_time"] = wall
+        elif line.startswith("Command:") and owner["transcript"] is None:
+            if owner["command_time"] is None:
+                owner["command_time"] = wall
+            owner["transcript"] = line[len("Command:"):].strip()
+        elif line.startswith("[SPECULATIVE]") and owner["command"] is None:
+            # fired from a partial transcript, before the endpoint and the final "Command:" line
+            owner["command_time"] = wall
+            owner["command"] = line.split()[1]
+        elif line.startswith("[MATCH]") and owner["command"] is None:
+            owner["command"] = line.split()[1]
+
+    rate = playlist.sample_rate
+    for u in utterances:
+        onset = playlist.wall_time_of(u["speech_start"])
+        end_of_speech = playlist.wall_time_of(u["speech_end"])
+        u["wake_latency"] = round(u["wake_time"] - onset, 3) if u["wake_time"] and onset else None
+        u["command_latency"] = (round(u["command_time"] - end_of_speech, 3)
+                                if u["command_time"] and end_of_speech else None)
+        if u["transcript"] is None and u["lines"]:
+            # plain transcription scripts print the text itself
+            u["transcript"] = " ".join(u["lines"])
+        for key in ("start", "speech_start", "speech_end", "end"):
+            u[key] = round(u[key] / rate, 3)
+        del u["wake_time"], u["command_time"]
+
+    wake = [u["wake_latency"] for u in utterances if u["wake_latency"] is not None]
+    command = [u["command_latency"] for u in utterances if u["command_latency"] is not None]
+    audio_seconds = len(playlist.audio) / rate
+    n = max(len(utterances), 1)
+    return {
+        "script": script,
+        "speed": playlist.speed,
+        "audio_seconds": round(audio_seconds, 3),
+        "wall_seconds": round(wall_seconds, 3),
+        "cpu_seconds": round(cpu_seconds, 3),
+        "rtf": round(cpu_seconds / audio_seconds, 4),
+        "summary": {
+            "utterances": len(utterances),
+            "wake_rate": round(len(wake) / n, 3),
+            "command_rate": round(len(command) / n, 3),
+            "match_rate": round(sum(u["command"] is not None for u in utterances) / n, 3),
+            "wake_latency_p50": _percentile(wake, 50),
+            "wake_latency_p95": _percentile(wake, 95),
+            "command_latency_p50": _percentile(command, 50),
+            "command_latency_p95": _percentile(command, 95),
+        },
+        "utterances": utterances,
+    }
+
+
+# lower is better for latencies/rtf, higher is better for rates
+LOWER_IS_BETTER = ("rtf", "wake_latency_p50", "wake_latency_p95", "command_latency_p50", "command_latency_p95")
+HIGHER_IS_BETTER = ("wake_rate", "command_rate", "match_rate")
+
+
+def compare(base, new, tolerance=0.10):
+    """Prints metric deltas; returns the list of regressed metric names."""
+    metrics_base = dict(base["summary"], rtf=base["rtf"])
+    metrics_new = dict(new["summary"], rtf=new["rtf"])
+    regressions = []
+    print(f"{'metric':<22}{'base':>10}{'new':>10}{'change':>10}")
+    for name in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+        a, b = metrics_base.get(name), metrics_new.get(name)
+        if a is None or b is None:
+            print(f"{name:<22}{str(a):>10}{str(b):>10}")
+            continue
+        change = (b - a) / a if a else (0.0 if b == a else float("inf"))
+        worse = change > tolerance if name in LOWER_IS_BETTER else change < -tolerance
+        if worse:
+            regressions.append(name)
+        print(f"{name:<22}{a:>10.3f}{b:>10.3f}{change:>+10.1%}{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+# ================================
+# CLI
+# ================================
+def load_utterances(source, sample_rate=SAMPLE_RATE):
+    paths = sorted(glob.glob(os.path.join(source, "*.wav"))) if os.path.isdir(source) else [source]
+    utterances, references = [], {}
+    for path in paths:
+        audio, rate = read_wav(path)
+        if rate != sample_rate:
+            raise ValueError(f"{path}: expected {sample_rate} Hz, got {rate} Hz")
+        utterances.append((path, audio))
+        ref = os.path.splitext(path)[0] + ".txt"
+        if os.path.exists(ref):
+            with open(ref, encoding="utf-8") as f:
+                references[os.path.basename(path)] = f.read().strip()
+    return utterances, references
+
+
+def run(script, source, speed=1.0, gap=3.0, settle=3.0, timeout=60.0):
+    utterances, references = load_utterances(source)
+    playlist = Playlist(utterances, speed=speed, gap=gap)
+    install_fake_device(playlist)
+
+    log = EventLog(playlist, sys.stdout)
+    threading.Thread(target=_stop_when_done, args=(playlist, log, settle, timeout), daemon=True).start()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    real_stdout, sys.stdout = sys.stdout, log
+    real_argv, sys.argv = sys.argv, [script]    # the script parses its own (empty) command line
+    wall0, cpu0 = time.time(), time.process_time()
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdout = real_stdout
+        sys.argv = real_argv
+    wall, cpu = time.time() - wall0, time.process_time() - cpu0
+    return build_report(os.path.basename(script), playlist, log, references, wall, cpu)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay WAV files through an entry script")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("run")
+    r.add_argument("script")
+    r.add_argument("source", help="WAV file or directory of WAV files (16 kHz)")
+    r.add_argument("--speed", type=float, default=1.0, help="1 = real time, 0 = as fast as possible")
+    r.add_argument("--gap", type=float, default=3.0, help="seconds of silence after each utterance")
+    r.add_argument("--settle", type=float, default=3.0, help="stop after this long without output")
+    r.add_argument("--out", default="replay_report.json")
+
+    c = sub.add_parser("compare")
+    c.add_argument("base")
+    c.add_argument("new")
+    c.add_argument("--tolerance", type=float, default=0.10, help="allowed relative change")
+
+    args = parser.parse_args()
+    if args.cmd == "run":
+        report = run(args.script, args.source, speed=args.speed, gap=args.gap, settle=args.settle)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(json.dumps(report["summary"], indent=2))
+        print(f"Report written to {args.out}")
+    else:
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        sys.exit(1 if compare(base, new, args.tolerance) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# resampler.py
+# Streaming sample-rate conversion for microphones that don't do 16 kHz.
+#
+#   resampler = Resampler(48000, 16000)
+#   n = resampler.process(block, out)     # any block size, state carried across calls
+#   consume(out[:n])
+#
+# Rational polyphase FIR: the rate changes by L/M (48000 -> 16000 is 1/3,
+# 44100 -> 16000 is 160/441). Output sample n needs one phase of a
+# Kaiser-windowed sinc low-pass (taps_per_phase coefficients) applied to the
+# input samples ending at (n * M) // L. The phase and input offset of every
+# output repeat every L outputs, so gather indices and coefficients are
+# tabulated once; a block is then one np.take into a preallocated window
+# matrix and one einsum into the output. The input the next outputs still
+# need (at most one period plus the filter length) is kept as history, so
+# block boundaries are seamless: any split of the input gives the same
+# output. The added latency is the filter delay (`delay` output samples,
+# ~1 ms at 48 kHz). The filter is centred on a multiple of `down`, so the
+# delay is a whole number of output samples and resample() can remove it
+# exactly.
+from math import gcd
+
+import numpy as np
+
+ZERO_CROSSINGS = 16     # sinc zero crossings on each side of the centre tap
+ROLLOFF = 0.9           # pass band edge as a share of the output Nyquist frequency
+BETA = 8.0              # Kaiser window shape, ~80 dB stop band
+
+
+def design_filter(up, down, zero_crossings=ZERO_CROSSINGS, rolloff=ROLLOFF, beta=BETA):
+    """Low-pass for the up-sampled rate, as an (up, taps_per_phase) polyphase matrix,
+    and its delay in output samples (an integer)."""
+    factor = max(up, down)
+    length = up * 2 * zero_crossings * max(1, -(-down // up))
+    # centre on a multiple of `down` at or after the natural centre, so the delay
+    # (centre / down output samples) has no fractional part
+    centre = -(-(length - 1) // (2 * down)) * down
+    length = 2 * centre + 1
+    taps_per_phase = -(-length // up)
+    cutoff = rolloff / (2 * factor)       # cycles per up-sampled sample
+    h = np.zeros(up * taps_per_phase)     # the taps past `length` stay zero
+    t = np.arange(length) - centre
+    h[:length] = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(length, beta)
+    h *= up / h.sum()                     # unity gain after zero-stuffing by `up`
+    # phase p holds h[p], h[p + up], h[p + 2 up], ... applied to x[i], x[i - 1], ...
+    return h.reshape(taps_per_phase, up).T, centre // down
+
+
+class Resampler:
+    def __init__(self, rate_in, rate_out=16000, max_block=None, dtype=np.float32):
+        g = gcd(int(rate_in), int(rate_out))
+        self.rate_in = int(rate_in)
+        self.rate_out = int(rate_out)
+        self.up = self.rate_out // g
+        self.down = self.rate_in // g
+        self.max_block = int(max_block or self.rate_in // 10)    # largest input block, default 100 ms
+        phases, self.delay = design_filter(self.up, self.down)   # delay: whole output samples
+        self.taps = phases.shape[1]
+
+        # rows for any max-size block starting at any phase
+        self.max_out = -(-self.max_block * self.up // self.down) + 1
+        rows = np.arange(self.up + self.max_out)
+        offsets = rows * self.down // self.up
+        # input sample per tap, relative to `taps - 1` samples before the start of the period
+        self.index = offsets[:, None] + (self.taps - 1 - np.arange(self.taps))[None, :]
+        self.coef = phases[rows * self.down % self.up].astype(dtype)
+
+        # history (up to one period + taps) + block, and the gathered windows
+        self.buffer = np.zeros(self.taps + self.down + self.max_block, dtype=dtype)
+        self.windows = np.empty((self.max_out, self.taps), dtype=dtype)
+        self.out = np.empty(self.max_out, dtype=dtype)
+        self.reset()
+
+    def reset(self):
+        self.buffer[:self.taps - 1] = 0.0
+        self.filled = self.taps - 1     # samples in buffer
+        self.base = -(self.taps - 1)    # input sample index of buffer[0] (history starts as zeros)
+        self.produced = 0               # output samples so far
+        self.consumed = 0               # input samples so far
+
+    def output_size(self, frames):
+        """Upper bound of process() outputs for a block of `frames` samples."""
+        return -(-frames * self.up // self.down) + 1
+
+    def process(self, block, out=None):
+        """Resamples one block into out (default: an internal buffer reused by the
+        next call). Returns the number of samples written."""
+        frames = len(block)
+        if frames > self.max_block:
+            # split, so the preallocated tables stay small; the caller provides the room
+            if out is None:
+                raise ValueError(f"block of {frames} samples needs `out` (max_block={self.max_block})")
+            n = 0
+            for i in range(0, frames, self.max_block):
+                n += self.process(block[i:i + self.max_block], out[n:])
+            return n
+        if out is None:
+            out = self.out
+
+        self.buffer[self.filled:self.filled + frames] = block
+        self.filled += frames
+        self.consumed += frames
+
+        # every output whose newest input sample has arrived
+        end = -(-self.consumed * self.up // self.down)
+        count = end - self.produced
+        if count > 0:
+            q, r = divmod(self.produced, self.up)
+            start = q * self.down - (self.taps - 1) - self.base
+            windows = self.windows[:count]
+            # mode="clip" writes straight into `windows` ("raise" buffers); the indices are all in range
+            np.take(self.buffer[start:], self.index[r:r + count], out=windows, mode="clip")
+            np.einsum("ij,ij->i", windows, self.coef[r:r + count], out=out[:count])
+            self.produced = end
+
+        # keep the history the next output needs, from the start of its period
+        keep_from = self.produced // self.up * self.down - (self.taps - 1)
+        drop = keep_from - self.base
+        if drop > 0:
+            kept = self.filled - drop
+            self.buffer[:kept] = self.buffer[drop:self.filled]
+            self.filled = kept
+            self.base = keep_from
+        return max(count, 0)
+
+    def flush(self, out=None):
+        """Pushes the filter tail out with zeros (end of a recording)."""
+        zeros = np.zeros(self.taps, dtype=self.buffer.dtype)
+        return self.process(zeros, out)
+
+
+def resample(audio, rate_in, rate_out=16000):
+    """Whole-array conversion with the filter delay removed (for recordings)."""
+    if rate_in == rate_out:
+        return np.asarray(audio, dtype=np.float32)
+    resampler = Resampler(rate_in, rate_out)
+    length = int(round(len(audio) * resampler.up / resampler.down))
+    out = np.empty(resampler.output_size(len(audio) + resampler.taps) + resampler.max_out, dtype=np.float32)
+    n = resampler.process(np.asarray(audio, dtype=np.float32), out)
+    n += resampler.flush(out[n:])
+    return out[resampler.delay:resampler.delay + length]
@@ -0,0 +1,156 @@
+# ring_buffer.py
+# Preallocated audio ring buffer shared by all the entry scripts.
+#
+# Audio lives in one fixed float32 array. Positions are absolute sample
+# indices on a monotonically increasing counter (`total`), so readers can ask
+# for "samples 48000..64000" and find out when those were already overwritten.
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-size circular buffer of audio samples.
+
+    Single writer. Readers get zero-copy views when the requested range is
+    contiguous in memory and a copy only when it wraps around the end of the
+    array. Make the capacity larger than the largest window that is read, so
+    the writer doesn't overwrite a view that is still being used.
+    """
+
+    def __init__(self, capacity, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.data = np.zeros(self.capacity, dtype=dtype)
+        self.total = 0          # samples written since creation (sample clock)
+        self.floor = 0          # samples before this position are discarded (clear())
+        # statistics
+        self.overruns = 0       # writes larger than the buffer + reads of overwritten data
+        self.dropped = 0        # samples lost because of overruns
+        self.wrap_copies = 0    # reads that had to copy because they wrapped
+
+    def __len__(self):
+        return self.available
+
+    @property
+    def available(self):
+        # samples that can still be read
+        return min(self.total - self.floor, self.capacity)
+
+    @property
+    def oldest(self):
+        # absolute position of the oldest readable sample
+        return self.total - self.available
+
+    def write(self, chunk):
+        n = len(chunk)
+        if n > self.capacity:
+            # only the newest `capacity` samples fit
+            self.overruns += 1
+            self.dropped += n - self.capacity
+            self.total += n - self.capacity
+            chunk = chunk[-self.capacity:]
+            n = self.capacity
+
+        start = self.total % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[start:start + first] = chunk[:first]
+        if first < n:
+            self.data[:n - first] = chunk[first:]
+        self.total += n
+
+    def view(self, start, end=None):
+        """Samples [start, end) in absolute positions.
+
+        If part of the range was already overwritten it is clipped to what is
+        still available and counted as an overrun.
+        """
+        end = self.total if end is None else min(end, self.total)
+        if start < self.oldest:
+            self.overruns += 1
+            self.dropped += self.oldest - start
+            start = self.oldest
+        n = end - start
+        if n <= 0:
+            return self.data[:0]
+
+        i = start % self.capacity
+        if i + n <= self.capacity:
+            return self.data[i:i + n]
+        self.wrap_copies += 1
+        return np.concatenate((self.data[i:], self.data[:i + n - self.capacity]))
+
+    def latest(self, n):
+        # last n samples (or fewer, if not that many are available)
+        n = min(int(n), self.available)
+        return self.view(self.total - n)
+
+    def clear(self):
+        # forget the buffered audio without resetting the sample clock
+        self.floor = self.total
+
+    def stats(self):
+        return {
+            "total": self.total,
+            "available": self.available,
+            "overruns": self.overruns,
+            "dropped": self.dropped,
+            "wrap_copies": self.wrap_copies,
+        }
+
+
+class SharedRingBuffer(RingBuffer):
+    """RingBuffer whose samples and sample clock live in shared memory.
+
+    One process creates it and writes; other processes attach() by name and
+    read zero-copy views of the same memory. Only `total` is shared; floor and
+    the statistics are per process.
+    """
+
+    HEADER = 8      # int64 slots in front of the samples, slot 0 is `total`
+
+    def __init__(self, shm, capacity, dtype=np.float32, owner=False):
+        self.shm = shm
+        self.owner = owner
+        self.capacity = int(capacity)
+        self.header = np.ndarray(self.HEADER, dtype=np.int64, buffer=shm.buf)
+        self.data = np.ndarray(self.capacity, dtype=dtype, buffer=shm.buf,
+                               offset=self.HEADER * 8)
+        self.floor = 0
+        self.overruns = 0
+        self.dropped = 0
+        self.wrap_copies = 0
+
+    @classmethod
+    def create(cls, capacity, dtype=np.float32):
+        from multiprocessing import shared_memory
+        size = cls.HEADER * 8 + int(capacity) * np.dtype(dtype).itemsize
+        ring = cls(shared_memory.SharedMemory(create=True, size=size), capacity, dtype, owner=True)
+        ring.header[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, capacity, dtype=np.float32):
+        from multiprocessing import shared_memory
+        return cls(shared_memory.SharedMemory(name=name), capacity, dtype)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def total(self):
+        return int(self.header[0])
+
+    @total.setter
+    def total(self, value):
+        # written after the samples, so readers never see a position without its data
+        self.header[0] = value
+
+    def valid(self, start):
+        # False once the writer has overwritten position `start`
+        return start >= self.total - self.capacity
+
+    def close(self):
+        # views into the buffer must not be used after this
+        self.header = self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
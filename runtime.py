@@ -0,0 +1,827 @@
+# runtime.py
+# One asyncio runtime behind all the entry scripts.
+#
+#   python runtime.py                              # preset "main_1.0": wake word + commands
+#   python runtime.py --preset fastest_whisper     # live streaming transcription
+#   python runtime.py --config runtime.json        # {"preset": "main_1.0", "wake_word": "jarvis"}
+#
+# The old entry scripts (main.py, main_faster.py, fastest_whisper.py,
+# main_updated.py, main_updated_with_commands.py, main_1.0.py) are presets
+# of this runtime now; running one of them is `python runtime.py --preset <name>`.
+#
+# Stages are coroutines connected by bounded queues:
+#
+#   capture --(asyncio.Queue of pool slots)--> frontend: ring buffer, VAD, metrics
+#     mode "chunks"    every block -> DecodeQueue -> print            (main, main_faster)
+#     mode "stream"    OnlineTranscriber, committed words printed     (fastest_whisper)
+#     mode "assistant" wake check -> DecodeQueue -> endpoint -> DecodeQueue
+#                      -> dispatch queue -> match -> execute          (main_updated*, main_1.0)
+#
+# With "cascade": true a command is decoded greedily first and accepted when
+# avg_logprob, no_speech_prob and the command match are all convincing;
+# otherwise the same audio is decoded again with cascade_model (loaded on
+# the first escalation, then kept) and cascade_beam_size. The share of
+# escalated commands is exported as cascade_escalation_ratio.
+#
+# With "speculative": true the growing command audio is decoded about every
+# 300 ms while there is new speech, and a partial transcript that matches a
+# command clearly ("speculate_min_score", "speculate_margin") runs it before
+# the endpoint. The final transcript confirms it, or contradicts it; then
+# "speculate_policy" decides: "cancel" terminates the speculated process and
+# runs the final command, "keep" leaves it running.
+#
+# Decodes run on one executor thread (the model is never used concurrently):
+# commands first, and only the newest wake check waits. The PortAudio
+# callback hands slots to the loop with call_soon_threadsafe, so while
+# nothing happens the process sleeps in the event loop. Ctrl-C and SIGTERM
+# set one stop event: capture stops, the queues drain and every stage exits.
+#
+# Settings are applied in order: preset, model_profile.json (model settings),
+# the config file, then command-line overrides.
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import signal
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import engine
+from actions import cancel, execute, play_beep
+from capture import AsyncAudioCapture
+from command_matcher import CommandIndex
+from command_recorder import CommandRecorder
+from endpointer import Endpointer
+from keyword_spotter import KeywordSpotter, TEMPLATES_FILE, wake_word_end
+from metrics import Metrics
+from model_profile import load_profile
+from ring_buffer import RingBuffer
+from vad import FrameVAD, trim_silence
+
+CONFIG_FILE = "runtime.json"
+MODEL_KEYS = ("model", "device", "compute_type", "cpu_threads", "beam_size", "fast_beam_size")
+
+# ================================
+# CONFIGURATION
+# ================================
+DEFAULTS = {
+    "mode": "assistant",            # "chunks", "stream" or "assistant"
+    "backend": "faster_whisper",    # "whisper" = openai-whisper, chunks mode only
+    "model": "tiny.en",
+    "device": "cpu",                # "auto" = cuda if torch sees a GPU (whisper backend)
+    "compute_type": "int8",
+    "cpu_threads": 0,
+    "beam_size": 5,                 # commands and chunks
+    "fast_beam_size": 1,            # wake checks, partials, streaming
+    "warmup": True,
+    "sample_rate": 16000,
+    "block": 0.03,                  # seconds per capture block
+    "input_device": "auto",         # best probed input (device_probe.py); an index, a name or None = system default
+    "device_rate": "native",        # a rate the microphone supports natively, resampled; None = ask for sample_rate
+    "ring_seconds": 10.0,
+    # stream
+    "min_chunk": 1.0,               # seconds of new audio between streaming decodes
+    "max_window": 15.0,
+    # assistant
+    "wake_word": "garmin",
+    "wake_window": 3.0,
+    "wake_hop": 0.5,
+    "max_wake_lag": 1.0,
+    "keyword_spotter": True,        # use wake_templates.npz if it exists
+    "kws_threshold": None,
+    "pause": 0.8,                   # trailing silence that ends a command
+    "min_pause": 0.3,               # ... after a confident partial match
+    "partial_after": 0.2,           # partial decode after this much silence, None = off
+    "no_speech": 1.5,               # the command must start within this time
+    "min_command": 0.3,
+    "max_command": 15.0,
+    "command_dtype": "float32",
+    "trim_lead": 0.15,
+    "trim_trail": 0.25,
+    "beep": True,
+    "commands": "commands.csv",
+    "match_threshold": 70,
+    "confident_margin": 10,
+    "execute": True,                # run the matched command, False = only print the text
+    # cascade: commands are decoded greedily first and only re-decoded when that looks unreliable
+    "cascade": False,
+    "cascade_model": "base.en",     # loaded on the first escalation; None = same model, wider beam
+    "cascade_beam_size": 5,
+    "cascade_min_logprob": -0.6,    # escalate below this avg_logprob ...
+    "cascade_max_no_speech": 0.5,   # ... above this no_speech_prob ...
+    "cascade_min_score": 85,        # ... or when the command match is weaker than this (or not clear)
+    # speculative: partial transcripts are matched while the command is still being spoken
+    "speculative": False,
+    "speculate_every": 0.3,         # seconds between partial decodes while there is new speech
+    "speculate_min_score": 90,      # fire on a partial match at least this good ...
+    "speculate_margin": 20,         # ... and this far ahead of the runner-up
+    "speculate_policy": "cancel",   # final result is another command: "cancel" stops the speculated
+                                    # process and runs the final command, "keep" leaves it
+    "metrics_port": None,
+    "trace": None,
+}
+
+# the behaviour each former entry script provided
+PRESETS = {
+    # beam_size None: openai-whisper's greedy decoding
+    "main": {"mode": "chunks", "backend": "whisper", "model": "base", "device": "auto",
+             "block": 2.0, "beam_size": None},
+    "main_faster": {"mode": "chunks", "backend": "whisper", "model": "tiny.en", "device": "auto",
+                    "block": 5.0, "beam_size": None},
+    "fastest_whisper": {"mode": "stream", "block": 0.05},
+    "main_updated": {"device": "cuda", "compute_type": "float16", "block": 0.5, "pause": 1.0,
+                     "min_command": 1.0, "partial_after": None, "keyword_spotter": False,
+                     "execute": False},
+    "main_updated_with_commands": {"block": 0.5, "pause": 1.0, "min_command": 1.0, "partial_after": None,
+                                   "keyword_spotter": False, "execute": False},
+    "main_1.0": {"device": "cuda", "compute_type": "float16", "metrics_port": 9464},
+}
+
+
+def load_config(preset=None, path=None, overrides=None):
+    saved = {}
+    path = path or (CONFIG_FILE if os.path.exists(CONFIG_FILE) else None)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+    preset = preset or saved.get("preset", "main_1.0")
+    if preset not in PRESETS:
+        raise ValueError(f"unknown preset {preset!r}, choose from {', '.join(PRESETS)}")
+    config = dict(DEFAULTS, **PRESETS[preset])
+    profile = load_profile(**{k: config[k] for k in MODEL_KEYS})
+    if config["backend"] == "whisper":
+        # device, compute_type and threads are CTranslate2 settings; openai-whisper keeps its own
+        profile = {k: profile[k] for k in ("model", "beam_size", "fast_beam_size")}
+    config.update(profile)
+    unknown = set(saved) - set(config) - {"preset"}
+    if unknown:
+        raise ValueError(f"{path}: unknown settings {', '.join(sorted(unknown))}")
+    config.update({k: v for k, v in saved.items() if k != "preset"})
+    config.update(overrides or {})
+    config["preset"] = preset
+    if config["backend"] == "whisper" and config["mode"] != "chunks":
+        raise ValueError("the whisper backend only supports the chunks mode")
+    return config
+
+
+# ================================
+# DECODING
+# ================================
+class Job:
+    def __init__(self, kind, position, fn, args, done, failed=None):
+        self.kind = kind
+        self.position = position      # sample-clock end of the decoded audio
+        self.fn = fn                  # runs on the executor thread
+        self.args = args
+        self.done = done              # called with the result, on the loop
+        self.failed = failed          # called with "error" or "dropped" when there is no result
+        self.submitted = time.perf_counter()
+
+
+class DecodeQueue:
+    """Every decode runs on one executor thread, so the model is never used
+    concurrently: commands first (at most `max_commands` waiting), only the
+    newest wake check kept, and dropped once it is more than `max_lag`
+    samples behind the audio."""
+
+    def __init__(self, executor, metrics, max_commands=2, max_lag=16000):
+        self.executor = executor
+        self.metrics = metrics
+        self.max_commands = max_commands
+        self.max_lag = max_lag
+        self.commands = deque()
+        self.wake = None
+        self.clock = 0
+        self.wakeup = asyncio.Event()
+        self.closed = False
+        self.completed = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def submit_wake(self, position, fn, args, done):
+        if self.wake is not None:
+            self.dropped += 1
+        self.wake = Job("wake", position, fn, args, done)
+        self.wakeup.set()
+
+    def submit_command(self, position, fn, args, done, failed=None):
+        if len(self.commands) >= self.max_commands:
+            dropped = self.commands.popleft()
+            self.dropped += 1
+            if dropped.failed is not None:
+                dropped.failed("dropped")
+        self.commands.append(Job("command", position, fn, args, done, failed))
+        self.wakeup.set()
+
+    def cancel_wake(self):
+        self.wake = None
+
+    def close(self):
+        # pending commands are still decoded
+        self.closed = True
+        self.wakeup.set()
+
+    def _next(self):
+        if self.commands:
+            return self.commands.popleft()
+        while self.wake is not None:
+            job, self.wake = self.wake, None
+            if self.clock - job.position <= self.max_lag:
+                return job
+            self.dropped += 1
+        return None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = self._next()
+            if job is None:
+                if self.closed:
+                    return
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            self.metrics.observe("queue_wait", time.perf_counter() - job.submitted, kind=job.kind)
+            try:
+                result = await loop.run_in_executor(self.executor, job.fn, *job.args)
+            except Exception as e:
+                self.errors += 1
+                print(f"{job.kind.capitalize()} error:", e)
+                if job.failed is not None:
+                    job.failed("error")
+                continue
+            self.completed += 1
+            job.done(result)
+
+    def stats(self):
+        return {"depth": len(self.commands) + (self.wake is not None), "completed": self.completed,
+                "dropped": self.dropped, "errors": self.errors}
+
+
+# ================================
+# MODES
+# ================================
+class Chunks:
+    """Every capture block is transcribed and printed (main.py, main_faster.py)."""
+
+    def __init__(self, rt):
+        self.rt = rt
+
+    def start(self):
+        print("Transcribing audio stream...\n")
+
+    async def on_audio(self, chunk, position):
+        self.rt.decoder.submit_command(position, self.rt.decode_text, (chunk.copy(), "chunk"), self._show)
+
+    def _show(self, text):
+        if text:
+            print(text)
+
+    async def finish(self):
+        pass
+
+
+class Stream:
+    """Incremental transcription: stable words are committed, the tail is redrawn (fastest_whisper.py)."""
+
+    def __init__(self, rt):
+        from streaming import OnlineTranscriber
+        self.rt = rt
+        self.transcriber = OnlineTranscriber(rt.model, sample_rate=rt.sample_rate,
+                                             min_chunk=rt.config["min_chunk"],
+                                             max_window=rt.config["max_window"],
+                                             beam_size=rt.config["fast_beam_size"])
+        self.line = ""      # committed text on the current screen line
+
+    def start(self):
+        print("Real-time transcription started... Press Ctrl+C to stop.\n")
+
+    async def on_audio(self, chunk, position):
+        self.transcriber.insert_audio(chunk)
+        if not self.transcriber.ready():
+            return
+        # nothing else touches the transcriber while it decodes; new blocks wait in the capture queue
+        try:
+            committed, tail = await asyncio.get_running_loop().run_in_executor(
+                self.rt.executor, self.transcriber.process)
+            self.show(committed, tail)
+        except Exception as e:
+            print("Transcription error:", e)
+
+    def show(self, committed, tail):
+        # committed words stay on screen; only the dim tentative tail after them is redrawn.
+        # A line that is full is ended with a newline, so \r never has to reach a wrapped line.
+        width = max(20, shutil.get_terminal_size().columns - 1)
+        for word in committed:
+            word = word[2].strip()
+            if not word:
+                continue
+            if self.line and len(self.line) + 1 + len(word) > width:
+                sys.stdout.write("\r\033[K" + self.line + "\n")
+                self.line = ""
+            self.line = f"{self.line} {word}" if self.line else word
+        text = "".join(w[2] for w in tail).strip()
+        room = width - len(self.line) - (1 if self.line else 0)
+        parts = [self.line] if self.line else []
+        if text and room > 0:
+            parts.append("\033[2m" + text[:room] + "\033[0m")
+        sys.stdout.write("\r\033[K" + " ".join(parts))
+        sys.stdout.flush()
+
+    async def finish(self):
+        self.show(self.transcriber.finish(), [])
+        if self.line:
+            print()
+
+
+class Assistant:
+    """Wake word, then a command ended by the endpointer, matched and executed
+    (main_updated.py, main_updated_with_commands.py, main_1.0.py)."""
+
+    def __init__(self, rt):
+        c = rt.config
+        sr = rt.sample_rate
+        self.rt = rt
+        self.c = c
+        self.wake_word = c["wake_word"]
+        self.command_buffer = CommandRecorder(c["max_command"], sr, dtype=c["command_dtype"])
+        self.endpointer = Endpointer(sr, silence=c["pause"], min_silence=c["min_pause"],
+                                     no_speech=c["no_speech"], max_length=c["max_command"])
+        self.command_index = CommandIndex(c["commands"])
+        if c["cascade"]:
+            rt.metrics.collect(self.cascade_stats, "cascade")
+        self.kws = None
+        if c["keyword_spotter"] and os.path.exists(TEMPLATES_FILE):
+            self.kws = KeywordSpotter.load(TEMPLATES_FILE, threshold=c["kws_threshold"])
+            print(f"Keyword spotter: {len(self.kws.templates)} templates, threshold={self.kws.threshold:.3f}")
+        self.dispatch = asyncio.Queue(maxsize=4)    # matched -> executed
+        self.paths = {"fast": 0, "escalated": 0}    # cascade: commands accepted from the greedy decode / re-decoded
+        self.recording = False
+        self.next_wake_check = 0
+        self.listen_from = 0        # audio before this (the previous command) is not checked again
+        self.partial_for = 0
+        self.utterance = None
+        self.speculate_at = 0       # position of the next speculative decode
+        self.speculated_to = 0      # speech end covered by the last one
+        self.speculated = {}        # utterance id -> [command, process] fired from a partial transcript
+
+    def start(self):
+        print("Loaded commands:", self.command_index.commands)
+        print(f"Say {self.wake_word} to activate...\n")
+
+    # ---- audio (loop) ----
+    async def on_audio(self, chunk, position):
+        rt, sr = self.rt, self.rt.sample_rate
+        if self.recording:
+            self.command_buffer.append(chunk)
+            eou = self.endpointer.update(position, rt.vad.last_speech_sample)
+            if eou is None:
+                if self.c["speculative"]:
+                    self._maybe_speculate(position)
+                else:
+                    self._maybe_partial(position)
+            else:
+                self._end_command(eou, position)
+            return
+
+        window_start = max(position - int(self.c["wake_window"] * sr), self.listen_from)
+        if (position >= self.next_wake_check and position - window_start >= sr
+                and rt.vad.speech_since(window_start)):
+            self.next_wake_check = position + int(self.c["wake_hop"] * sr)
+            kws_end = None
+            if self.kws is not None:
+                # cheap first stage: Whisper only confirms what the spotter found
+                window = rt.ring.latest(self.kws.window_samples)
+                end = self.kws.detect(window)
+                if end is None:
+                    return
+                kws_end = position - len(window) + end
+            rt.decoder.submit_wake(position, self._decode_wake, (window_start, position, kws_end),
+                                   self._on_wake)
+
+    def _maybe_partial(self, position):
+        # at the start of a pause: a confident partial match shortens the pause needed
+        after = self.c["partial_after"]
+        if after is None or self.endpointer.pause(position) < after * self.rt.sample_rate:
+            return
+        if self.partial_for == self.endpointer.last_speech:
+            return
+        self.partial_for = speech_end = self.endpointer.last_speech
+        self.rt.decoder.submit_wake(position, self.rt.decode_text,
+                                    (self.command_buffer.view().copy(), "partial"),
+                                    lambda text: self._on_partial(text, speech_end))
+
+    def _maybe_speculate(self, position):
+        # every speculate_every seconds, if there was speech since the last decode
+        last_speech = self.endpointer.last_speech
+        if not self.endpointer.speech_seen or position < self.speculate_at or last_speech <= self.speculated_to:
+            return
+        self.speculate_at = position + int(self.c["speculate_every"] * self.rt.sample_rate)
+        self.speculated_to = last_speech
+        utt = self.utterance
+        self.rt.decoder.submit_wake(position, self.rt.decode_text,
+                                    (self.command_buffer.view().copy(), "speculative"),
+                                    lambda text: self._on_speculative(text, utt, last_speech))
+
+    def _end_command(self, eou, position):
+        sr = self.rt.sample_rate
+        self.recording = False
+        self.listen_from = position
+        utt, self.utterance = self.utterance, None
+        utt.mark("speech_end", eou.end)
+        utt.mark("endpoint", eou.detected)
+        # a command that already fired is always decoded, the final result decides whether it stands
+        if (eou.reason != "no_speech" and eou.end - eou.start >= self.c["min_command"] * sr
+                or utt.id in self.speculated):
+            audio = self.command_buffer.view().copy()     # the next command may start before this decodes
+            self.rt.decoder.submit_command(position, self._decode_command, (audio, self.rt.vad.noise_floor_db, utt),
+                                           lambda text: self._on_command(text, utt),
+                                           lambda reason: self._command_failed(reason, utt))
+        else:
+            utt.finish(outcome="no_speech" if eou.reason == "no_speech" else "too_short")
+        self.command_buffer.clear()
+
+    # ---- decodes (executor thread) ----
+    def _decode_wake(self, start, position, kws_end):
+        rt = self.rt
+        audio = rt.ring.view(max(start, rt.ring.oldest), position)
+        t0 = time.perf_counter()
+        segments, _ = rt.model.transcribe(audio, language="en", beam_size=self.c["fast_beam_size"],
+                                          word_timestamps=kws_end is None, temperature=0.0)
+        rt.metrics.decode("wake", time.perf_counter() - t0, len(audio) / rt.sample_rate)
+        end = wake_word_end(segments, self.wake_word)
+        if end is None:
+            return None
+        return start, kws_end if kws_end is not None else start + int(end * rt.sample_rate)
+
+    def _decode_command(self, audio, noise_floor_db, utt):
+        rt, c = self.rt, self.c
+        # leading and trailing silence never reach the model
+        trimmed = trim_silence(audio, noise_floor_db, rt.sample_rate, lead=c["trim_lead"], trail=c["trim_trail"])
+        print(f"Transcribing command... ({len(trimmed) / rt.sample_rate:.2f}s, "
+              f"{(len(audio) - len(trimmed)) / rt.sample_rate:.2f}s silence trimmed)")
+        if len(trimmed) == 0:
+            return "", trimmed, None
+        utt.mark("decode_start")
+        beam = c["fast_beam_size"] if c["cascade"] else c["beam_size"]
+        text, segments = rt.decode(trimmed, "command", utt, beam_size=beam)
+        return text, trimmed, segments
+
+    def _decode_escalated(self, audio, utt):
+        rt = self.rt
+        text, segments = rt.decode(audio, "escalation", utt, model=rt.cascade_model(),
+                                   beam_size=self.c["cascade_beam_size"])
+        return text, audio, segments
+
+    # ---- results (loop) ----
+    def _on_wake(self, found):
+        if found is None or self.recording:
+            return
+        start, wake_end = found
+        if wake_end < self.listen_from:
+            return
+        rt = self.rt
+        self.utterance = rt.metrics.utterance(start)
+        self.utterance.mark("wake_detected")
+        self.utterance.mark("wake_end", wake_end)
+        print(f"[WAKE WORD DETECTED: {self.wake_word.upper()}]")
+        rt.decoder.cancel_wake()
+        # the command starts right after the wake word, including the audio heard since
+        self.command_buffer.clear()
+        self.command_buffer.append(rt.ring.view(max(wake_end, rt.ring.oldest), rt.ring.total))
+        self.endpointer.start(wake_end)
+        self.recording = True
+        if self.c["beep"]:
+            asyncio.get_running_loop().run_in_executor(None, play_beep, rt.sample_rate)
+
+    def _on_partial(self, text, speech_end):
+        ranked = self.command_index.match(text, n=1) if text else []
+        threshold = self.c["match_threshold"]
+        if ranked and ranked[0][1] >= threshold and ranked[0][2] >= self.c["confident_margin"]:
+            self.endpointer.hint((ranked[0][1] - threshold) / (100 - threshold), speech_end)
+
+    def _on_speculative(self, text, utt, speech_end):
+        if utt is not self.utterance:
+            return      # that command has ended, the final decode is on its way
+        ranked = self.command_index.match(text, n=1) if text else []
+        if not ranked:
+            return
+        command, score, margin = ranked[0]
+        c = self.c
+        if score >= c["match_threshold"] and margin >= c["confident_margin"]:
+            self.endpointer.hint((score - c["match_threshold"]) / (100 - c["match_threshold"]), speech_end)
+        if (utt.id in self.speculated or not c["execute"]
+                or score < c["speculate_min_score"] or margin < c["speculate_margin"]):
+            return
+        try:
+            self.dispatch.put_nowait(("speculative", command, utt))
+        except asyncio.QueueFull:
+            return
+        self.speculated[utt.id] = [command, None]
+        utt.mark("speculative")
+        print(f"[SPECULATIVE] {command} (score={score:.1f}): {text.lower()}")
+        self.rt.metrics.inc("speculative", result="fired")
+
+    def _escalation(self, text, segments):
+        # why the fast decode can't be trusted, or None
+        c = self.c
+        logprob, no_speech = confidence(segments)
+        if logprob < c["cascade_min_logprob"]:
+            return f"avg_logprob {logprob:.2f}"
+        if no_speech > c["cascade_max_no_speech"]:
+            return f"no_speech_prob {no_speech:.2f}"
+        if c["execute"]:
+            ranked = self.command_index.match(text, n=1)
+            if not ranked or ranked[0][1] < c["cascade_min_score"]:
+                return f"match score {ranked[0][1]:.0f}" if ranked else "no command"
+            if ranked[0][2] < c["confident_margin"]:
+                return f"match margin {ranked[0][2]:.0f}"
+        return None
+
+    def cascade_stats(self):
+        total = self.paths["fast"] + self.paths["escalated"]
+        return dict(self.paths, escalation_ratio=self.paths["escalated"] / total if total else 0.0)
+
+    def _on_command(self, result, utt, escalated=False):
+        text, audio, segments = result
+        # nothing left after trimming, or nothing heard: a bigger model wouldn't do better
+        if self.c["cascade"] and not escalated and text:
+            reason = self._escalation(text, segments)
+            path = "escalated" if reason else "fast"
+            self.paths[path] += 1
+            self.rt.metrics.inc("cascade", path=path)
+            utt.fields["path"] = path
+            if reason:
+                print(f"[ESCALATE] {reason}")
+                utt.fields["escalation"] = reason
+                self.rt.decoder.submit_command(self.rt.decoder.clock, self._decode_escalated, (audio, utt),
+                                               lambda result: self._on_command(result, utt, escalated=True),
+                                               lambda reason: self._command_failed(reason, utt))
+                return
+        text = text.lower()
+        if not text and utt.id not in self.speculated:
+            print("Command empty")
+            utt.finish(outcome="empty")
+            return
+        print(f"Command: {text}")
+        if not self.c["execute"]:
+            utt.finish(outcome="transcribed", text=text)
+            return
+        try:
+            self.dispatch.put_nowait(("command", text, utt))
+        except asyncio.QueueFull:
+            print("Dispatch queue full, command dropped")
+            self.speculated.pop(utt.id, None)
+            utt.finish(outcome="dropped", text=text)
+
+    def _command_failed(self, reason, utt):
+        # no final transcript will come: a speculated command stays as it is
+        self.speculated.pop(utt.id, None)
+        utt.finish(outcome=reason)
+
+    # ---- dispatch stage ----
+    async def dispatcher(self):
+        while True:
+            item = await self.dispatch.get()
+            if item is None:
+                return
+            kind, payload, utt = item
+            if kind == "speculative":
+                entry = self.speculated.get(utt.id)
+                if entry is None:
+                    continue    # the final command was dropped or failed before this ran
+                with utt.timer("execute"):
+                    entry[1] = execute(payload)
+                continue
+            text = payload
+            with utt.timer("match"):
+                result = self.command_index.best(text, threshold=self.c["match_threshold"])
+            speculated = self.speculated.pop(utt.id, None)
+            if speculated is not None:
+                self._resolve(speculated, result, text, utt)
+                continue
+            if result is None:
+                print("No matching command found.")
+                utt.finish(outcome="no_match", text=text)
+                continue
+            command, score = result
+            print(f"[MATCH] {command} (score={score:.1f})")
+            with utt.timer("execute"):
+                execute(command)
+            utt.finish(outcome="executed", text=text, command=command, score=round(score, 1))
+
+    def _resolve(self, speculated, result, text, utt):
+        # the final transcript of a command that already fired from a partial one
+        command, process = speculated
+        final, score = result if result is not None else (None, 0.0)
+        marks = utt.marks
+        self.rt.metrics.observe("speculative_lead", (marks["speech_end"] - marks["speculative"]) / self.rt.sample_rate)
+        if final == command:
+            print(f"[CONFIRMED] {command} (score={score:.1f})")
+            outcome = "confirmed"
+        elif self.c["speculate_policy"] == "keep":
+            print(f"[KEPT] {command} (final: {final or 'no match'})")
+            outcome = "kept"
+        else:
+            print(f"[CANCELLED] {command} (final: {final or 'no match'})")
+            outcome = "cancelled"
+            cancel(process)
+        self.rt.metrics.inc("speculative", result=outcome)
+        if outcome == "cancelled" and final is not None:
+            print(f"[MATCH] {final} (score={score:.1f})")
+            with utt.timer("execute"):
+                execute(final)
+            command = final
+        elif outcome == "cancelled":
+            utt.finish(outcome="no_match", text=text, speculative=outcome)
+            return
+        utt.finish(outcome="executed", text=text, command=command, score=round(score, 1), speculative=outcome)
+
+    async def finish(self):
+        await self.dispatch.put(None)
+
+
+MODES = {"chunks": Chunks, "stream": Stream, "assistant": Assistant}
+
+
+def confidence(segments):
+    """Duration-weighted avg_logprob and the highest no_speech_prob of a decode."""
+    if not segments:
+        return 0.0, 0.0
+    weights = [max(s.end - s.start, 0.01) for s in segments]
+    logprob = sum(getattr(s, "avg_logprob", 0.0) * w for s, w in zip(segments, weights)) / sum(weights)
+    return logprob, max(getattr(s, "no_speech_prob", 0.0) for s in segments)
+
+
+# ================================
+# RUNTIME
+# ================================
+class Runtime:
+    def __init__(self, config):
+        self.config = config
+        self.sample_rate = config["sample_rate"]
+        self.metrics = Metrics(self.sample_rate)
+        self.ring = RingBuffer(int(config["ring_seconds"] * self.sample_rate))
+        self.vad = FrameVAD(sample_rate=self.sample_rate)
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="decode")
+        self.model = None
+        self._cascade_model = None
+        self.decoder = None
+        self.mode = None
+        self.capture = None
+        self.stop = None
+
+    def load_model(self):
+        c = self.config
+        if c["backend"] == "whisper":
+            device = c["device"]
+            if device == "auto":
+                import torch    # a dependency of whisper anyway
+                device = "cuda" if torch.cuda.is_available() else "cpu"
+            c["device"] = device
+            print(f"Loading Whisper model '{c['model']}' on {device}...")
+            self.model = engine.load_model(backend="whisper", model_size_or_path=c["model"], device=device,
+                                           warmup=c["warmup"])
+        else:
+            print(f"Loading Faster-Whisper model '{c['model']}' on {c['device']} ({c['compute_type']})...")
+            self.model = engine.load_model(c, warmup=c["warmup"])
+
+    def decode(self, audio, kind, utterance=None, model=None, beam_size=None):
+        # executor thread; returns (text, segments), segments are None for the whisper backend
+        c = self.config
+        model = model or self.model
+        if beam_size is None:
+            beam_size = c["fast_beam_size"] if kind in ("partial", "speculative") else c["beam_size"]
+        t0 = time.perf_counter()
+        if c["backend"] == "whisper":
+            result = model.transcribe(audio, language="en", beam_size=beam_size, fp16=c["device"] == "cuda")
+            text, segments = result["text"], None
+        else:
+            segments, _ = model.transcribe(audio, language="en", beam_size=beam_size, temperature=0.0)
+            text = " ".join(s.text for s in segments)
+        self.metrics.decode(kind, time.perf_counter() - t0, len(audio) / self.sample_rate, utterance)
+        return text.strip(), segments
+
+    def decode_text(self, audio, kind, utterance=None):
+        return self.decode(audio, kind, utterance)[0]
+
+    def cascade_model(self):
+        """The larger model commands escalate to: loaded on first use, then resident."""
+        c = self.config
+        if not c["cascade_model"]:
+            return self.model
+        if self._cascade_model is None:
+            print(f"Loading cascade model '{c['cascade_model']}'...")
+            self._cascade_model = engine.load_model(dict(c, model=c["cascade_model"]), warmup=c["warmup"])
+        return self._cascade_model
+
+    async def frontend(self):
+        capture = self.capture
+        while True:
+            slot = await capture.aget()
+            if slot is None:
+                break
+            self.metrics.observe("capture", capture.delay(slot))
+            try:
+                chunk = capture.block(slot)
+                self.ring.write(chunk)
+                position = self.ring.total
+                self.decoder.clock = position
+                self.metrics.tick(position)
+                with self.metrics.timer("vad"):
+                    self.vad.process(chunk)
+                await self.mode.on_audio(chunk, position)
+            finally:
+                capture.release(slot)
+        await self.mode.finish()
+        self.decoder.close()
+
+    def _request_stop(self):
+        if not self.stop.is_set():
+            print("\nExiting..")
+            self.stop.set()
+
+    async def run(self):
+        c = self.config
+        loop = asyncio.get_running_loop()
+        self.stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._request_stop)
+            except (NotImplementedError, RuntimeError):
+                signal.signal(sig, lambda *_: loop.call_soon_threadsafe(self._request_stop))
+
+        self.load_model()
+        self.decoder = DecodeQueue(self.executor, self.metrics,
+                                   max_lag=int(c["max_wake_lag"] * self.sample_rate))
+        self.mode = MODES[c["mode"]](self)
+        self.capture = AsyncAudioCapture(self.sample_rate, blocksize=int(c["block"] * self.sample_rate),
+                                         device=c["input_device"], device_rate=c["device_rate"])
+        self.metrics.collect(self.capture.stats, "capture")
+        self.metrics.collect(self.decoder.stats, "decoder")
+        if c["metrics_port"] is not None:
+            self.metrics.serve(c["metrics_port"])
+        if c["trace"]:
+            self.metrics.trace_to(c["trace"])
+
+        self.capture.start()
+        engine.listening()
+        self.mode.start()
+        tasks = [asyncio.create_task(self.frontend()), asyncio.create_task(self.decoder.run())]
+        if isinstance(self.mode, Assistant):
+            tasks.append(asyncio.create_task(self.mode.dispatcher()))
+        stopped = asyncio.create_task(self.stop.wait())
+        # a stage that dies takes the runtime down with it
+        done, _ = await asyncio.wait(tasks + [stopped], return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task is not stopped and task.exception() is not None:
+                print("Stage failed:", repr(task.exception()))
+        self.capture.stop()         # the frontend sees None, the mode finishes, the decoder drains
+        try:
+            await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=10.0)
+        except asyncio.TimeoutError:
+            print("Shutdown timed out")
+        stopped.cancel()
+        self.executor.shutdown(wait=False)
+        print("Model:", self.model.stats())
+        if self._cascade_model is not None:
+            print("Cascade model:", self._cascade_model.stats())
+        print("Decoder:", self.decoder.stats())
+        print("Capture:", self.capture.stats())
+        print("Metrics:", self.metrics.snapshot())
+        self.metrics.close()
+
+
+def main(preset=None, argv=None):
+    parser = argparse.ArgumentParser(description="Voice assistant / transcription runtime")
+    parser.add_argument("--preset", default=preset, help=f"one of: {', '.join(PRESETS)}")
+    parser.add_argument("--config", help=f"JSON settings file (default: {CONFIG_FILE} if present)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help='override a setting, value parsed as JSON (e.g. --set wake_word=\\"jarvis\\")')
+    args = parser.parse_args(argv)
+
+    overrides = {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        try:
+            overrides[key] = json.loads(value)
+        except ValueError:
+            overrides[key] = value
+    try:
+        config = load_config(args.preset, args.config, overrides)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    print(f"Preset: {config['preset']} ({config['mode']})")
+    try:
+        asyncio.run(Runtime(config).run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# streaming.py
+# Incremental streaming transcription with committed-prefix agreement.
+#
+# Instead of re-decoding a fixed rolling window, only the audio that has not
+# been committed yet is decoded. A word is committed once two consecutive
+# hypotheses agree on it, and the audio up to the end of the last committed
+# word is dropped from the window.
+from ring_buffer import RingBuffer
+
+SAMPLE_RATE = 16000
+
+
+class HypothesisBuffer:
+    """Keeps the committed words and the revisable tail of the last hypothesis.
+
+    Words are (start, end, text) tuples with absolute times in seconds.
+    """
+
+    def __init__(self):
+        self.committed = []       # append-only
+        self.tail = []            # previous, not yet confirmed hypothesis
+        self.last_committed_end = 0.0
+
+    def insert(self, words):
+        # ignore words that end before what was already committed
+        words = [w for w in words if w[1] > self.last_committed_end + 0.05]
+
+        # the decode window may start slightly before the last commit: drop an
+        # n-gram at the start of the new hypothesis repeating the committed end
+        if words and self.committed and abs(words[0][0] - self.last_committed_end) < 1.0:
+            for n in range(min(len(self.committed), len(words), 5), 0, -1):
+                old = [_norm(w[2]) for w in self.committed[-n:]]
+                new = [_norm(w[2]) for w in words[:n]]
+                if old == new:
+                    words = words[n:]
+                    break
+
+        # commit the longest common prefix of the previous and the new hypothesis
+        newly_committed = []
+        while words and self.tail and _norm(words[0][2]) == _norm(self.tail[0][2]):
+            word = words.pop(0)
+            self.tail.pop(0)
+            newly_committed.append(word)
+
+        if newly_committed:
+            self.committed.extend(newly_committed)
+            self.last_committed_end = newly_committed[-1][1]
+        self.tail = words
+        return newly_committed
+
+    def flush_tail(self):
+        # force the tail into the committed stream (end of audio / window overflow)
+        words = self.tail
+        self.tail = []
+        if words:
+            self.committed.extend(words)
+            self.last_committed_end = words[-1][1]
+        return words
+
+
+class OnlineTranscriber:
+    """Decodes only the uncommitted part of the audio stream.
+
+    insert_audio() appends new samples, process() runs one decode and returns
+    (newly_committed_words, tail_words).
+    """
+
+    def __init__(self, model, sample_rate=SAMPLE_RATE, min_chunk=1.0,
+                 max_window=15.0, keep_on_silence=1.0, prompt_chars=200,
+                 **transcribe_kwargs):
+        self.model = model
+        self.sample_rate = sample_rate
+        self.min_chunk = int(min_chunk * sample_rate)
+        self.max_window = int(max_window * sample_rate)
+        self.keep_on_silence = int(keep_on_silence * sample_rate)
+        self.prompt_chars = prompt_chars
+        self.transcribe_kwargs = dict(language="en", beam_size=1, vad_filter=False,
+                                      condition_on_previous_text=False)
+        self.transcribe_kwargs.update(transcribe_kwargs)
+
+        # uncommitted audio is ring[window_start:ring.total]; the extra
+        # capacity leaves room for the chunks written while a decode runs
+        self.ring = RingBuffer(self.max_window + 2 * self.min_chunk)
+        self.window_start = 0                        # absolute sample index of the window
+        self.pending = 0                             # samples added since the last decode
+        self.hypothesis = HypothesisBuffer()
+
+    @property
+    def window(self):
+        self.window_start = max(self.window_start, self.ring.oldest)
+        return self.ring.view(self.window_start)
+
+    def insert_audio(self, chunk):
+        self.ring.write(chunk)
+        self.pending += len(chunk)
+
+    def ready(self):
+        return self.pending >= self.min_chunk
+
+    def committed_text(self):
+        return "".join(w[2] for w in self.hypothesis.committed).strip()
+
+    def process(self):
+        self.pending = 0
+        audio = self.window
+        if len(audio) == 0:
+            return [], []
+
+        offset = self.window_start / self.sample_rate
+        prompt = self.committed_text()[-self.prompt_chars:] or None
+        segments, _ = self.model.transcribe(
+            audio, initial_prompt=prompt, word_timestamps=True,
+            **self.transcribe_kwargs
+        )
+        words = [
+            (offset + w.start, offset + w.end, w.word)
+            for seg in segments for w in (seg.words or [])
+        ]
+
+        committed = self.hypothesis.insert(words)
+        if committed:
+            self._trim_to(self.hypothesis.last_committed_end)
+        elif not words and self._window_len() > self.keep_on_silence:
+            # nothing was heard: keep only a short tail for the next word onset
+            self._trim_samples(self._window_len() - self.keep_on_silence)
+
+        if self._window_len() > self.max_window:
+            # hypotheses keep changing: stop waiting for agreement
+            committed = committed + self.hypothesis.flush_tail()
+            self._trim_to(self.hypothesis.last_committed_end)
+            if self._window_len() > self.max_window:
+                self._trim_samples(self._window_len() - self.keep_on_silence)
+
+        return committed, list(self.hypothesis.tail)
+
+    def finish(self):
+        # commit whatever is left, e.g. on shutdown
+        return self.hypothesis.flush_tail()
+
+    def _trim_to(self, seconds):
+        self._trim_samples(int(seconds * self.sample_rate) - self.window_start)
+
+    def _window_len(self):
+        return self.ring.total - self.window_start
+
+    def _trim_samples(self, n):
+        self.window_start += max(0, min(n, self._window_len()))
+
+
+def _norm(word):
+    return "".join(c for c in word.lower() if c.isalnum())
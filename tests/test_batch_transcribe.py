@@ -0,0 +1,57 @@
+import json
+import os
+
+import numpy as np
+
+import batch_transcribe
+from batch_transcribe import _signature, drop_incomplete, load_manifest, plan_chunks
+
+RATE = 16000
+
+
+def test_hard_cut_chunks_do_not_overlap(monkeypatch):
+    # 70 s of unbroken speech, then a short phrase after a pause
+    regions = [[RATE, 71 * RATE], [72 * RATE, 74 * RATE]]
+    monkeypatch.setattr(batch_transcribe, "speech_regions", lambda samples, rate: regions)
+    chunks = plan_chunks(np.zeros(80 * RATE, np.int16), RATE, max_chunk=30.0, pad=0.2)
+    for (s1, e1), (s2, e2) in zip(chunks, chunks[1:]):
+        assert e1 <= s2
+    assert all(e - s <= 30 * RATE for s, e in chunks)
+    assert chunks[0][0] == int(0.8 * RATE)          # padded at the pause before the speech
+    assert chunks[-1][1] == int(74.2 * RATE)
+    covered = sum(e - s for s, e in chunks)
+    assert covered >= 72 * RATE
+
+
+def write_lines(path, entries):
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(e) + "\n" for e in entries)
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_changed_file_loses_its_old_transcripts(tmp_path):
+    same, changed = str(tmp_path / "same.wav"), str(tmp_path / "changed.wav")
+    for path in (same, changed):
+        with open(path, "wb") as f:
+            f.write(b"x" * 100)
+    old = _signature(changed)
+    with open(changed, "wb") as f:
+        f.write(b"y" * 200)     # edited after the last run
+
+    manifest, out = str(tmp_path / "t.jsonl.manifest"), str(tmp_path / "t.jsonl")
+    write_lines(manifest, [{"file": same, "chunk": [0, 10], "signature": _signature(same)},
+                           {"file": changed, "chunk": [0, 10], "signature": old}])
+    write_lines(out, [{"file": same, "chunk": [0, 10], "text": "kept"},
+                      {"file": changed, "chunk": [0, 10], "text": "stale"},
+                      {"file": same, "chunk": [10, 20], "text": "unfinished"}])
+
+    done = load_manifest(manifest)
+    drop_incomplete(out, done)
+    assert list(done) == [(same, 0, 10)]
+    assert [e["file"] for e in read_lines(manifest)] == [same]
+    assert [e["text"] for e in read_lines(out)] == ["kept"]
+    assert not os.path.exists(out + ".tmp")
@@ -0,0 +1,23 @@
+import os
+
+from command_matcher import CommandIndex
+
+
+def write(path, text, mtime):
+    with open(path, "wb") as f:
+        f.write(text)
+    os.utime(path, (mtime, mtime))
+
+
+def test_malformed_reload_keeps_the_previous_commands(tmp_path):
+    path = str(tmp_path / "commands.csv")
+    write(path, b"command,phrase\nopen_chrome,open chrome\n", 1000)
+    index = CommandIndex(path, check_interval=0)
+    assert index.best("open chrome")[0] == "open_chrome"
+
+    write(path, b"command,phrase\nopen_firefox,open \xff\xfe firefox\n", 2000)    # not UTF-8
+    assert index.best("open chrome")[0] == "open_chrome"
+
+    write(path, b"command,phrase\nopen_firefox,open firefox\n", 3000)
+    assert index.best("open firefox")[0] == "open_firefox"
+    assert index.best("open chrome", threshold=90) is None
@@ -0,0 +1,20 @@
+import numpy as np
+
+from command_recorder import CommandRecorder
+
+
+def test_int16_round_trip_keeps_the_level():
+    rng = np.random.default_rng(0)
+    audio = (0.5 * rng.standard_normal(16000)).clip(-0.99, 0.99).astype(np.float32)
+    recorder = CommandRecorder(max_seconds=2.0, dtype="int16")
+    for i in range(0, len(audio), 480):
+        recorder.append(audio[i:i + 480])
+    restored = recorder.view()
+    assert np.max(np.abs(restored - audio)) <= 0.5 / 32768 + 1e-7
+    assert abs(np.std(restored) / np.std(audio) - 1.0) < 1e-4
+
+
+def test_int16_clips_full_scale():
+    recorder = CommandRecorder(max_seconds=1.0, dtype="int16")
+    recorder.append(np.array([1.5, 1.0, -1.0, -1.5], dtype=np.float32))
+    assert recorder.data[:4].tolist() == [32767, 32767, -32768, -32768]
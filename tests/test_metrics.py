@@ -0,0 +1,45 @@
+from metrics import Metrics
+
+
+def families(text):
+    # metric family of every sample line, in order
+    names = []
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        name = line.split("{")[0].split(" ")[0]
+        for suffix in ("_sum", "_count"):
+            if name.endswith(suffix) and name[:-len(suffix)] in names:
+                name = name[:-len(suffix)]
+        names.append(name)
+    return names
+
+
+def test_samples_of_a_family_are_contiguous():
+    metrics = Metrics()
+    for path in ("fast", "escalated", "fast"):
+        metrics.inc("cascade", path=path)
+    metrics.inc("utterances", outcome="executed")
+    metrics.observe("decode", 0.1, kind="wake")
+    metrics.observe("decode", 0.2, kind="command")
+    metrics.set("depth", 3, queue="decode")
+    metrics.set("depth", 1, queue="dispatch")
+    names = families(metrics.render())
+    ended = set()
+    for previous, name in zip(names, names[1:]):
+        if name != previous:
+            ended.add(previous)
+            assert name not in ended, f"{name} is split"
+    assert names.count("voice_cascade_total") == 2
+    assert names.count("voice_cascade_per_second") == 2
+
+
+def test_type_comes_once_before_the_samples():
+    metrics = Metrics()
+    metrics.inc("cascade", path="fast")
+    metrics.inc("cascade", path="escalated")
+    lines = metrics.render().splitlines()
+    types = [line for line in lines if line.startswith("# TYPE voice_cascade")]
+    assert types == ["# TYPE voice_cascade_total counter", "# TYPE voice_cascade_per_second gauge"]
+    total = lines.index(types[0])
+    assert all(line.startswith("voice_cascade_total{") for line in lines[total + 1:total + 3])
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from resampler import Resampler, resample
+
+
+def sine(rate, seconds=1.0, freq=1000.0):
+    t = np.arange(int(seconds * rate)) / rate
+    return np.sin(2 * np.pi * freq * t).astype(np.float32)
+
+
+def streamed(audio, rate, rng):
+    # random block sizes, as capture callbacks deliver them, plus the flush
+    resampler = Resampler(rate, 16000, max_block=2048)
+    out = np.empty(len(audio) + 4096, dtype=np.float32)
+    n, i = 0, 0
+    while i < len(audio):
+        size = int(rng.integers(1, 2048))
+        n += resampler.process(audio[i:i + size], out[n:])
+        i += size
+    n += resampler.flush(out[n:])
+    return out[:n], resampler.delay
+
+
+@pytest.mark.parametrize("rate", [44100, 48000, 22050, 8000])
+def test_one_shot_matches_an_analytic_sine(rate):
+    out = resample(sine(rate), rate)
+    assert len(out) == 16000
+    expected = sine(16000)
+    edge = 64       # the filter sees zeros outside the recording
+    assert np.max(np.abs(out[edge:-edge] - expected[edge:-edge])) < 1e-3
+
+
+@pytest.mark.parametrize("rate", [44100, 48000])
+def test_block_split_matches_one_shot(rate):
+    audio = np.random.default_rng(0).standard_normal(rate).astype(np.float32) * 0.1
+    one_shot = resample(audio, rate)
+    out, delay = streamed(audio, rate, np.random.default_rng(1))
+    assert isinstance(delay, int)
+    np.testing.assert_allclose(out[delay:delay + len(one_shot)], one_shot, atol=1e-6)
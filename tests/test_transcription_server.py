@@ -0,0 +1,163 @@
+import asyncio
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from transcription_server import N_FRAMES, BatchDecoder, TranscriptionServer, pad_or_trim
+
+SAMPLE_RATE = 16000
+
+
+def test_pad_or_trim():
+    assert pad_or_trim(np.ones((80, 1200), np.float32)).shape == (80, N_FRAMES)
+    assert pad_or_trim(np.ones((80, 4500), np.float32)).shape == (80, N_FRAMES)
+    padded = pad_or_trim(np.ones((80, 10), np.float32))
+    assert padded[:, :10].all() and not padded[:, 10:].any()
+
+
+class _Vocabulary:
+    # the few special tokens faster_whisper's Tokenizer asks the HF tokenizer for
+    ids = {"<|startoftranscript|>": 50257, "<|endoftext|>": 50256, "<|notimestamps|>": 50362,
+           "<|transcribe|>": 50358}
+
+    def token_to_id(self, token):
+        return self.ids[token]
+
+    def decode(self, tokens):
+        return " hello" if tokens else ""
+
+
+class _Result:
+    def __init__(self):
+        self.sequences_ids = [[1, 2]]
+        self.no_speech_prob = 0.1
+
+
+class _CTranslate2Whisper:
+    device = "cpu"
+    device_index = [0]
+    is_multilingual = False
+
+    def encode(self, features, to_cpu=False):
+        self.encoded_shape = tuple(features.shape)
+        return features
+
+    def generate(self, encoded, prompts, **options):
+        self.prompts = prompts
+        return [_Result() for _ in prompts]
+
+
+class _WhisperModel:
+    def __init__(self, feature_extractor):
+        self.feature_extractor = feature_extractor
+        self.hf_tokenizer = _Vocabulary()
+        self.model = _CTranslate2Whisper()
+
+
+def test_batch_goes_through_the_real_package():
+    # the import path of the pinned faster-whisper and ctranslate2, with a fake network
+    pytest.importorskip("ctranslate2")
+    feature_extractor = pytest.importorskip("faster_whisper.feature_extractor")
+    model = _WhisperModel(feature_extractor.FeatureExtractor())
+    decoder = BatchDecoder(model)
+    segments = [np.zeros(16000, np.float32), np.zeros(40000, np.float32), np.zeros(16000 * 35, np.float32)]
+    results = decoder(segments)
+    assert model.model.encoded_shape == (3, 80, N_FRAMES)
+    assert model.model.prompts == [[50257, 50362]] * 3
+    assert results == [("hello", 0.1)] * 3
+
+
+# ================================
+# SERVER
+# ================================
+
+
+def utterance_pcm(seed):
+    # quiet, half a second of a tone, quiet: one utterance for the endpointer
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(0.5 * SAMPLE_RATE)) / SAMPLE_RATE
+    tone = 0.3 * np.sin(2 * np.pi * 300 * t)
+    audio = np.concatenate((0.001 * rng.standard_normal(8000), tone, 0.001 * rng.standard_normal(16000)))
+    return (audio * 32767).astype("<i2").tobytes()
+
+
+class FakeDecoder:
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, segments):
+        with self.lock:
+            self.batches.append(len(segments))
+        return [(f"segment of {len(a)}", 0.0) for a in segments]
+
+
+async def client(port, name, pcm):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write((json.dumps({"name": name, "format": "s16le"}) + "\n").encode())
+    writer.write(pcm)
+    writer.write_eof()
+    replies = [json.loads(line) async for line in reader]
+    writer.close()
+    return replies
+
+
+async def run_server(decoder, max_batch, max_wait, clients):
+    server = TranscriptionServer(decoder, max_batch=max_batch, max_wait=max_wait)
+    batcher = asyncio.create_task(server.batcher())
+    tcp = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = tcp.sockets[0].getsockname()[1]
+    try:
+        return await asyncio.wait_for(
+            asyncio.gather(*(client(port, name, pcm) for name, pcm in clients)), 10)
+    finally:
+        batcher.cancel()
+        tcp.close()
+        await tcp.wait_closed()
+
+
+def test_segments_from_two_clients_share_a_batch():
+    decoder = FakeDecoder()
+    replies = asyncio.run(run_server(decoder, max_batch=2, max_wait=2.0,
+                                     clients=[("a", utterance_pcm(0)), ("b", utterance_pcm(1))]))
+    assert decoder.batches == [2]
+    assert [[r["client"] for r in client_replies] for client_replies in replies] == [["a"], ["b"]]
+    assert all(r["batch"] == 2 and r["text"] for client_replies in replies for r in client_replies)
+
+
+def test_max_wait_flushes_a_partial_batch():
+    decoder = FakeDecoder()
+    started = time.perf_counter()
+    replies = asyncio.run(run_server(decoder, max_batch=8, max_wait=0.2, clients=[("a", utterance_pcm(0))]))
+    assert decoder.batches == [1]
+    (reply,) = replies[0]
+    assert reply["batch"] == 1
+    assert 0.15 <= reply["latency"]["queue"] < 1.0
+    assert time.perf_counter() - started < 5.0
+
+
+def test_hello_that_is_not_an_object_closes_the_connection():
+    errors = []
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        server = TranscriptionServer(FakeDecoder())
+        tcp = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        port = tcp.sockets[0].getsockname()[1]
+        try:
+            results = []
+            for hello in (b"[]\n", b"1\n", b'"x"\n', b"not json\n"):
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(hello)
+                results.append(await asyncio.wait_for(reader.read(), 2))
+                writer.close()
+            return results
+        finally:
+            tcp.close()
+            await tcp.wait_closed()
+
+    assert asyncio.run(run()) == [b""] * 4
+    assert errors == []     # the handler returned instead of dying with an exception
@@ -0,0 +1,44 @@
+import numpy as np
+
+from vad import FrameVAD
+
+SAMPLE_RATE = 16000
+CHUNK = 480     # 30 ms, what the runtime feeds
+
+
+def feed(vad, audio):
+    flags = [vad.process(audio[i:i + CHUNK]) for i in range(0, len(audio), CHUNK)]
+    return np.concatenate(flags)
+
+
+def quiet(seconds, rng):
+    return (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 10 ** (-70 / 20)).astype(np.float32)
+
+
+def hum(seconds, level_db=-30.0, freq=120.0):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (np.sqrt(2) * 10 ** (level_db / 20) * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_noise_that_starts_after_quiet_becomes_the_floor():
+    rng = np.random.default_rng(0)
+    vad = FrameVAD(sample_rate=SAMPLE_RATE)
+    feed(vad, quiet(2.0, rng))
+    flags = feed(vad, hum(10.0) + quiet(10.0, rng))
+    frames_per_second = SAMPLE_RATE // vad.frame_len
+    # taken for speech at first, learned within a few seconds
+    assert flags[:frames_per_second].all()
+    assert not flags[-3 * frames_per_second:].any()
+    assert vad.noise_floor_db > -33.0
+
+
+def test_speech_over_a_learned_noise_is_still_detected():
+    rng = np.random.default_rng(1)
+    vad = FrameVAD(sample_rate=SAMPLE_RATE)
+    feed(vad, quiet(1.0, rng))
+    feed(vad, hum(6.0) + quiet(6.0, rng))
+    t = np.arange(int(0.5 * SAMPLE_RATE)) / SAMPLE_RATE
+    burst = (0.3 * np.sin(2 * np.pi * 300 * t) * np.sin(np.pi * t / 0.5)).astype(np.float32)
+    flags = feed(vad, hum(1.5) + np.concatenate((np.zeros(8000, np.float32), burst, np.zeros(8000, np.float32))))
+    assert flags.any()
+    assert not flags[-10:].any()
@@ -0,0 +1,353 @@
+# transcription_server.py
+# One Whisper model for many audio streams (rooms, remote clients).
+#
+#   python transcription_server.py serve --port 8765
+#   python transcription_server.py client test.wav --name kitchen
+#
+# Protocol (TCP, localhost by default): the client sends one JSON line
+#   {"name": "kitchen", "format": "s16le"}        (or "f32le")
+# followed by raw 16 kHz mono PCM. The server answers with JSON lines, one per
+# transcribed utterance, and closes after the client half-closes its side.
+#
+# Every stream has its own RingBuffer, FrameVAD and Endpointer. Finished
+# utterances from all streams go into one queue; the batcher takes whatever
+# is waiting (up to --max-batch, waiting at most --max-wait for more after
+# the first one) and decodes it with a single encoder and generate call, so
+# throughput grows with the number of clients instead of decodes running one
+# at a time.
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import engine
+from endpointer import Endpointer
+from model_profile import load_profile
+from ring_buffer import RingBuffer
+from vad import FrameVAD
+
+HOST = "127.0.0.1"
+PORT = 8765
+SAMPLE_RATE = 16000
+RING_SECONDS = 30.0
+PREROLL = 0.3           # audio kept before the chunk where speech was first seen
+TAIL = 0.2              # audio kept after the last speech frame
+PAUSE_THRESHOLD = 0.6
+MAX_SEGMENT = 20.0      # longer utterances are cut (Whisper sees at most 30 s)
+MAX_BATCH = 8
+MAX_WAIT = 0.05
+MODEL = dict(model_size_or_path="tiny.en", device="cpu", compute_type="int8", cpu_threads=4)
+N_FRAMES = 3000         # Whisper's encoder input: 30 s of 10 ms mel frames
+
+
+# ================================
+# BATCHED DECODING
+# ================================
+class BatchDecoder:
+    """Greedy/beam decoding of several segments with one encoder and one generate call.
+
+    Uses the CTranslate2 model inside faster_whisper.WhisperModel directly,
+    since WhisperModel.transcribe() and WhisperModel.encode() handle one audio
+    at a time (encode() adds the batch axis itself).
+    """
+
+    def __init__(self, model, beam_size=1, language="en", max_length=224):
+        import ctranslate2
+        from faster_whisper.tokenizer import Tokenizer
+        self.model = model
+        self.beam_size = beam_size
+        self.max_length = max_length
+        self.storage = ctranslate2.StorageView.from_array
+        # as WhisperModel.encode(): several GPUs return the encoder output on the CPU
+        self.to_cpu = model.model.device == "cuda" and len(model.model.device_index) > 1
+        self.tokenizer = Tokenizer(model.hf_tokenizer, model.model.is_multilingual,
+                                   task="transcribe", language=language)
+        self.prompt = list(self.tokenizer.sot_sequence) + [self.tokenizer.no_timestamps]
+
+    def __call__(self, segments):
+        """Returns (text, no_speech_prob) for every audio segment."""
+        features = np.stack([pad_or_trim(self.model.feature_extractor(a)) for a in segments])
+        encoded = self.model.model.encode(self.storage(features), to_cpu=self.to_cpu)
+        results = self.model.model.generate(
+            encoded, [self.prompt] * len(segments), beam_size=self.beam_size,
+            max_length=self.max_length, return_no_speech_prob=True,
+            suppress_blank=True, suppress_tokens=[-1])
+        return [(self.tokenizer.decode(r.sequences_ids[0]).strip(), r.no_speech_prob)
+                for r in results]
+
+
+def pad_or_trim(features, frames=N_FRAMES):
+    # (n_mels, n) log-mel features to exactly `frames` frames, zero-padded at the end
+    n = features.shape[-1]
+    if n > frames:
+        return np.ascontiguousarray(features[:, :frames])
+    if n < frames:
+        return np.pad(features, ((0, 0), (0, frames - n)))
+    return features
+
+
+# ================================
+# STREAMS
+# ================================
+class ClientStream:
+    """Per-connection audio state: ring buffer, VAD, endpointer, latency log."""
+
+    def __init__(self, name, sample_rate=SAMPLE_RATE):
+        self.name = name
+        self.sample_rate = sample_rate
+        self.ring = RingBuffer(int(RING_SECONDS * sample_rate))
+        self.vad = FrameVAD(sample_rate=sample_rate)
+        self.endpointer = Endpointer(sample_rate, silence=PAUSE_THRESHOLD, no_speech=RING_SECONDS,
+                                     max_length=MAX_SEGMENT, guard=0.0)
+        self.heard = 0              # speech before this position is already in a segment
+        self.pending = 0            # segments queued or being decoded
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.latencies = []
+
+    def feed(self, chunk):
+        """Adds audio; returns finished utterances as (start, end, speech_end, detected, audio)."""
+        self.ring.write(chunk)
+        position = self.ring.total
+        self.vad.process(chunk)
+        last_speech = self.vad.last_speech_sample
+        if not self.endpointer.active and last_speech > self.heard:
+            start = max(self.heard, self.ring.oldest,
+                        position - len(chunk) - int(PREROLL * self.sample_rate))
+            self.endpointer.start(start)
+        eou = self.endpointer.update(position, last_speech)
+        return [] if eou is None else [self._segment(eou.start, eou.end, position)]
+
+    def flush(self):
+        # end of stream: whatever is still open is an utterance
+        if not self.endpointer.active or not self.endpointer.speech_seen:
+            return []
+        self.endpointer.stop()
+        return [self._segment(self.endpointer.start_position, self.endpointer.last_speech,
+                              self.ring.total)]
+
+    def _segment(self, start, speech_end, detected):
+        self.heard = speech_end
+        end = min(speech_end + int(TAIL * self.sample_rate), self.ring.total)
+        # a copy: the ring keeps being written while the segment waits for its batch
+        return start, end, speech_end, detected, self.ring.view(start, end).copy()
+
+    def stats(self):
+        lat = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {"client": self.name, "segments": len(self.latencies),
+                "latency_p50": round(float(np.percentile(lat, 50)), 3),
+                "latency_p95": round(float(np.percentile(lat, 95)), 3),
+                "seconds": round(self.ring.total / self.sample_rate, 1)}
+
+
+class Request:
+    def __init__(self, stream, writer, segment):
+        self.stream = stream
+        self.writer = writer
+        self.start, self.end, self.speech_end, self.detected, self.audio = segment
+        self.queued = time.perf_counter()
+
+
+# ================================
+# SERVER
+# ================================
+class TranscriptionServer:
+    def __init__(self, decoder, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        self.decoder = decoder
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(1)     # the model is used by one thread, in batches
+        self.streams = set()
+        self.batches = 0
+        self.batched = 0
+
+    async def handle(self, reader, writer):
+        try:
+            hello = json.loads(await reader.readline() or b"{}")
+        except ValueError:
+            hello = None
+        if not isinstance(hello, dict):
+            writer.close()
+            return
+        peer = writer.get_extra_info("peername")
+        stream = ClientStream(hello.get("name") or f"{peer[0]}:{peer[1]}")
+        dtype = np.dtype("<f4") if hello.get("format") == "f32le" else np.dtype("<i2")
+        scale = 1.0 if dtype.kind == "f" else 1.0 / 32768.0
+        self.streams.add(stream)
+        print(f"[{stream.name}] connected ({dtype.name})")
+
+        leftover = b""
+        try:
+            while True:
+                data = await reader.read(8192)
+                if not data:
+                    break
+                data = leftover + data
+                usable = len(data) - len(data) % dtype.itemsize
+                leftover = data[usable:]
+                chunk = np.frombuffer(data[:usable], dtype=dtype).astype(np.float32) * scale
+                for segment in stream.feed(chunk):
+                    self._submit(stream, writer, segment)
+            for segment in stream.flush():
+                self._submit(stream, writer, segment)
+            await stream.idle.wait()
+        except ConnectionError:
+            pass
+        finally:
+            self.streams.discard(stream)
+            print(f"[{stream.name}] disconnected", stream.stats())
+            writer.close()
+
+    def _submit(self, stream, writer, segment):
+        stream.pending += 1
+        stream.idle.clear()
+        self.queue.put_nowait(Request(stream, writer, segment))
+
+    async def batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            started = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self.executor, self.decoder,
+                                                     [r.audio for r in batch])
+            except Exception as e:
+                print("Decode error:", e)
+                results = [("", 1.0)] * len(batch)
+            done = time.perf_counter()
+            self.batches += 1
+            self.batched += len(batch)
+            for request, (text, no_speech) in zip(batch, results):
+                self._reply(request, text, no_speech, started, done, len(batch))
+
+    def _reply(self, request, text, no_speech, started, done, batch_size):
+        stream = request.stream
+        rate = stream.sample_rate
+        # silence waited for by the endpointer + queueing + decoding
+        endpoint = (request.detected - request.speech_end) / rate
+        latency = endpoint + done - request.queued
+        stream.latencies.append(latency)
+        message = {"client": stream.name, "start": round(request.start / rate, 3),
+                   "end": round(request.end / rate, 3), "text": text,
+                   "no_speech_prob": round(float(no_speech), 3), "batch": batch_size,
+                   "latency": {"endpoint": round(endpoint, 3),
+                               "queue": round(started - request.queued, 3),
+                               "decode": round(done - started, 3), "total": round(latency, 3)}}
+        print(f"[{stream.name}] {message['start']:.2f}-{message['end']:.2f} {text!r} "
+              f"(batch {batch_size}, {latency * 1000:.0f} ms)")
+        if not request.writer.is_closing():
+            request.writer.write((json.dumps(message) + "\n").encode())
+        stream.pending -= 1
+        if stream.pending == 0:
+            stream.idle.set()
+
+    def stats(self):
+        return {"batches": self.batches,
+                "mean_batch": round(self.batched / self.batches, 2) if self.batches else 0.0,
+                "clients": [s.stats() for s in self.streams]}
+
+
+async def serve(args):
+    profile = load_profile(model=MODEL["model_size_or_path"], device=MODEL["device"],
+                           compute_type=MODEL["compute_type"], cpu_threads=MODEL["cpu_threads"], beam_size=1)
+    for key in ("model", "compute_type", "cpu_threads", "beam_size"):
+        if getattr(args, key) is not None:      # command line beats the profile
+            profile[key] = getattr(args, key)
+    handle = engine.load_model(profile, warmup=False)
+    decoder = BatchDecoder(handle.model, beam_size=profile["beam_size"])
+    if not args.no_warmup:
+        # a full batch of silence, so the first clients don't pay for kernel setup at this batch size
+        t0 = time.perf_counter()
+        decoder([np.zeros(SAMPLE_RATE, dtype=np.float32)] * args.max_batch)
+        handle.warmup_seconds = time.perf_counter() - t0
+    server = TranscriptionServer(decoder, max_batch=args.max_batch, max_wait=args.max_wait)
+    batcher = asyncio.create_task(server.batcher())
+    tcp = await asyncio.start_server(server.handle, args.host, args.port)
+    engine.listening(f"Listening on {args.host}:{args.port}")
+    try:
+        async with tcp:
+            await tcp.serve_forever()
+    finally:
+        batcher.cancel()
+        print("Server:", server.stats())
+
+
+# ================================
+# CLIENT
+# ================================
+async def stream_wav(args):
+    from wav_io import read_wav
+    audio, rate = read_wav(args.wav)
+    if rate != SAMPLE_RATE:
+        raise SystemExit(f"{args.wav}: {rate} Hz, expected {SAMPLE_RATE} Hz")
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    writer.write((json.dumps({"name": args.name, "format": "s16le"}) + "\n").encode())
+
+    async def receive():
+        async for line in reader:
+            print(line.decode().rstrip())
+
+    receiving = asyncio.create_task(receive())
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    block = int(0.02 * SAMPLE_RATE)
+    start = time.monotonic()
+    for i in range(0, len(pcm), block):
+        writer.write(pcm[i:i + block].tobytes())
+        await writer.drain()
+        if args.speed > 0:
+            delay = start + (i + block) / SAMPLE_RATE / args.speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+    writer.write_eof()
+    await receiving
+    writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-client transcription server")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("serve")
+    s.add_argument("--host", default=HOST)
+    s.add_argument("--port", type=int, default=PORT)
+    s.add_argument("--model", help="overrides model_profile.json")
+    s.add_argument("--compute-type")
+    s.add_argument("--cpu-threads", type=int)
+    s.add_argument("--beam-size", type=int)
+    s.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    s.add_argument("--max-wait", type=float, default=MAX_WAIT, help="seconds to wait for a fuller batch")
+    s.add_argument("--no-warmup", action="store_true", help="skip the warm-up batch at startup")
+    c = sub.add_parser("client", help="stream a 16 kHz WAV file to the server")
+    c.add_argument("wav")
+    c.add_argument("--name", default=None)
+    c.add_argument("--host", default=HOST)
+    c.add_argument("--port", type=int, default=PORT)
+    c.add_argument("--speed", type=float, default=1.0, help="1 = real time, 0 = as fast as possible")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args) if args.cmd == "serve" else stream_wav(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
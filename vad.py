@@ -0,0 +1,166 @@
+# vad.py
+# Frame-level voice activity detection, vectorized with NumPy.
+#
+# Every chunk is cut into short frames (20 ms by default) and three features
+# are computed for all frames at once:
+#   - short-time energy (dBFS), compared against an adaptive noise floor
+#   - zero-crossing rate (noise and fricatives cross zero much more often)
+#   - spectral flatness (voiced speech has a peaky spectrum, noise a flat one)
+# A frame is speech when it is clearly above the noise floor and looks like
+# speech by ZCR or flatness. A hangover keeps short pauses inside words and
+# between words marked as speech.
+#
+# The noise floor uses minimum statistics: it follows a low percentile of
+# the energy of ALL recent frames (speech or not), rising slowly and falling
+# fast. A steady noise that starts later (a fan, mains hum) looks like speech
+# at first, but fills the window within a couple of seconds and then becomes
+# the floor; speech has pauses, so the percentile stays at the noise level.
+import numpy as np
+
+EPS = 1e-10
+
+
+class FrameVAD:
+    """Streaming VAD. Feed it consecutive chunks with process().
+
+    Positions are absolute sample indices counted from the first chunk, so
+    they can be compared with RingBuffer.total.
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=20, hangover_ms=300,
+                 margin_db=9.0, min_energy_db=-55.0, max_flatness=0.45,
+                 max_zcr=0.35, floor_rise=0.02, floor_fall=0.3, floor_window_ms=2000,
+                 floor_percentile=10):
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.hangover = max(1, int(hangover_ms / frame_ms))
+        self.margin_db = margin_db
+        self.min_energy_db = min_energy_db
+        self.max_flatness = max_flatness
+        self.max_zcr = max_zcr
+        self.floor_rise = floor_rise        # per-frame EMA weight when the floor goes up
+        self.floor_fall = floor_fall        # ... and when it goes down (follows quiet rooms fast)
+        self.floor_percentile = floor_percentile
+        # frame energies of the last floor_window_ms, the floor's minimum statistics
+        self.history = np.zeros(max(1, int(floor_window_ms / frame_ms)), dtype=np.float32)
+        self.history_pos = 0
+        self.history_len = 0
+
+        self.window = np.hanning(self.frame_len).astype(np.float32)
+        freqs = np.fft.rfftfreq(self.frame_len, 1.0 / sample_rate)
+        self.band = (freqs >= 100) & (freqs <= 4000)    # where speech energy is
+
+        self.noise_floor_db = None
+        self.remainder = np.zeros(self.frame_len, dtype=np.float32)
+        self.n_remainder = 0
+        self.frames_seen = 0
+        self.last_speech_frame = -(10 ** 9)
+
+    @property
+    def last_speech_sample(self):
+        # absolute end position of the last speech frame (before hangover)
+        return (self.last_speech_frame + 1) * self.frame_len
+
+    def features(self, frames):
+        # energy (dBFS), zero-crossing rate and spectral flatness per frame
+        energy_db = 10.0 * np.log10(np.mean(frames * frames, axis=1) + EPS)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_len - 1)
+        power = np.abs(np.fft.rfft(frames * self.window, axis=1))[:, self.band] ** 2 + EPS
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+        return energy_db, zcr, flatness
+
+    def process(self, chunk):
+        """Returns one speech/non-speech flag per complete frame in the chunk."""
+        chunk = np.asarray(chunk, dtype=np.float32)
+        # prepend the incomplete frame left over from the previous chunk
+        if self.n_remainder:
+            need = self.frame_len - self.n_remainder
+            head = np.concatenate((self.remainder[:self.n_remainder], chunk[:need]))
+            chunk = chunk[need:]
+        else:
+            head = None
+
+        n_frames = len(chunk) // self.frame_len
+        frames = chunk[:n_frames * self.frame_len].reshape(n_frames, self.frame_len)
+        if head is not None and len(head) == self.frame_len:
+            frames = np.concatenate((head[None, :], frames))
+            self.n_remainder = 0
+        elif head is not None:
+            # still not a full frame
+            self.remainder[:len(head)] = head
+            self.n_remainder = len(head)
+            return np.zeros(0, dtype=bool)
+
+        rest = chunk[n_frames * self.frame_len:]
+        self.remainder[:len(rest)] = rest
+        self.n_remainder = len(rest)
+        if len(frames) == 0:
+            return np.zeros(0, dtype=bool)
+
+        energy_db, zcr, flatness = self.features(frames)
+        if self.noise_floor_db is None:
+            self.noise_floor_db = max(float(np.percentile(energy_db, 10)), self.min_energy_db - self.margin_db)
+
+        loud = (energy_db > self.noise_floor_db + self.margin_db) & (energy_db > self.min_energy_db)
+        raw = loud & ((flatness < self.max_flatness) | (zcr < self.max_zcr))
+
+        # hangover: a frame is speech if raw speech occurred in the last `hangover` frames
+        idx = np.arange(self.frames_seen, self.frames_seen + len(frames))
+        last = np.maximum.accumulate(np.where(raw, idx, self.last_speech_frame))
+        speech = (idx - last) < self.hangover
+        if raw.any():
+            self.last_speech_frame = int(last[-1])
+        self.frames_seen += len(frames)
+
+        self._update_floor(energy_db)
+        return speech
+
+    def _update_floor(self, energy_db):
+        # every frame goes into the history, flagged as speech or not: a noise that was
+        # taken for speech still becomes the floor once it fills the window
+        size = len(self.history)
+        n = len(energy_db)
+        recent = energy_db[-size:]
+        self.history[(self.history_pos + np.arange(len(recent))) % size] = recent
+        self.history_pos = (self.history_pos + len(recent)) % size
+        self.history_len = min(size, self.history_len + len(recent))
+        level = float(np.percentile(self.history[:self.history_len], self.floor_percentile))
+        # slow rise, fast fall: a steady noise source is learned in a few seconds,
+        # and a quieter room is followed almost immediately
+        weight = self.floor_fall if level < self.noise_floor_db else self.floor_rise
+        weight = 1.0 - (1.0 - weight) ** n
+        self.noise_floor_db += weight * (level - self.noise_floor_db)
+
+    def is_speech(self, chunk):
+        return bool(self.process(chunk).any())
+
+    def speech_since(self, position):
+        # True if speech was seen at or after an absolute sample position
+        return self.last_speech_sample > position
+
+
+def trim_silence(audio, noise_floor_db=None, sample_rate=16000, frame_ms=20, margin_db=9.0,
+                 min_energy_db=-55.0, lead=0.15, trail=0.25):
+    """Cuts leading and trailing non-speech from a finished recording.
+
+    A frame counts as speech when its energy is `margin_db` above the noise
+    floor (FrameVAD.noise_floor_db if given, else estimated from the quietest
+    frames). `lead`/`trail` seconds are kept around the speech so soft onsets
+    and word endings survive. Returns a view; all-silent audio gives an empty one.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    frame_len = int(sample_rate * frame_ms / 1000)
+    n_frames = len(audio) // frame_len
+    if n_frames == 0:
+        return audio
+    frames = audio[:n_frames * frame_len].reshape(n_frames, frame_len)
+    energy_db = 10.0 * np.log10(np.mean(frames * frames, axis=1) + EPS)
+    if noise_floor_db is None:
+        noise_floor_db = float(np.percentile(energy_db, 10))
+    speech = np.flatnonzero((energy_db > noise_floor_db + margin_db) & (energy_db > min_energy_db))
+    if len(speech) == 0:
+        return audio[:0]
+    start = max(0, speech[0] * frame_len - int(lead * sample_rate))
+    end = min(len(audio), (speech[-1] + 1) * frame_len + int(trail * sample_rate))
+    return audio[start:end]
@@ -0,0 +1,97 @@
+# wav_io.py
+# Reading and writing 16-bit PCM WAV files without scipy, and memory-mapped
+# access to long recordings.
+import os
+import wave
+
+import numpy as np
+
+
+def read_wav(path):
+    """Returns (float32 mono samples in [-1, 1], sample_rate)."""
+    with wave.open(str(path), "rb") as f:
+        rate = f.getframerate()
+        channels = f.getnchannels()
+        width = f.getsampwidth()
+        raw = f.readframes(f.getnframes())
+
+    if width == 2:
+        audio = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        audio = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    elif width == 1:
+        audio = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    else:
+        raise ValueError(f"{path}: unsupported sample width {width}")
+
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio, rate
+
+
+def write_wav(path, audio, sample_rate):
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+
+
+_PCM_TYPES = {(1, 8): np.uint8, (1, 16): "<i2", (1, 32): "<i4", (3, 32): "<f4"}
+
+
+def memmap_wav(path):
+    """Maps the samples of a PCM/float WAV file without reading them.
+
+    Returns (samples, sample_rate): samples is a read-only np.memmap of shape
+    (frames, channels) in the file's own format; convert the part you need
+    with to_float32().
+    """
+    with open(path, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            raise ValueError(f"{path}: not a WAV file")
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path}: no data chunk")
+            chunk_id, size = header[:4], int.from_bytes(header[4:], "little")
+            if chunk_id == b"fmt ":
+                body = f.read(size + size % 2)
+                tag = int.from_bytes(body[0:2], "little")
+                channels = int.from_bytes(body[2:4], "little")
+                rate = int.from_bytes(body[4:8], "little")
+                bits = int.from_bytes(body[14:16], "little")
+                if tag == 0xFFFE and size >= 26:      # WAVE_FORMAT_EXTENSIBLE: real tag in the GUID
+                    tag = int.from_bytes(body[24:26], "little")
+                fmt = (tag, channels, rate, bits)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"{path}: data before fmt chunk")
+                offset = f.tell()
+                break
+            else:
+                f.seek(size + size % 2, 1)
+
+    tag, channels, rate, bits = fmt
+    dtype = _PCM_TYPES.get((tag, bits))
+    if dtype is None:
+        raise ValueError(f"{path}: unsupported format tag {tag} with {bits} bits")
+    dtype = np.dtype(dtype)
+    # the size field is often wrong in files that were still being written
+    frames = min(size, os.path.getsize(path) - offset) // (dtype.itemsize * channels)
+    samples = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(frames, channels))
+    return samples, rate
+
+
+def to_float32(samples):
+    # (frames, channels) slice of memmap_wav() -> float32 mono in [-1, 1]
+    if samples.dtype == np.uint8:
+        audio = (samples.astype(np.float32) - 128.0) / 128.0
+    elif samples.dtype.kind == "f":
+        audio = samples.astype(np.float32)
+    else:
+        audio = samples.astype(np.float32) / float(2 ** (8 * samples.dtype.itemsize - 1))
+    return audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]